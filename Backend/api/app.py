@@ -1,18 +1,27 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
+from fastapi import FastAPI, File, UploadFile, HTTPException, status, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from core.models import APIResponse, ErrorResponse, ModelTestRequest
-from core.summarizer import generate_summary, create_gemini_llm, create_groq_llm
-from core.models import SummaryResponse
+from core.models import APIResponse, ModelTestRequest
+from core.summarizer import summarize_transcript, create_gemini_llm, create_groq_llm
+from core.models import SummaryResponse, JobSubmitResponse, JobStatusResponse, JobStageStatus
+from core.jobs import job_manager, Job, JobQueueFullError
 from config import GEMINI_MODEL_NAME, WHISPER_MODEL_SIZE, GROQ_MODEL_NAME
 from utils.validation import validate_audio_file
-from api import auth, storage, chat_history, chat_query
-from utils.audio import transcribe_audio_simple
-import os
-import tempfile
-import shutil
+from api import auth, storage, chat_history, chat_query, transcript_stream, batch, summary_stream
+from fastapi.security import HTTPAuthorizationCredentials
+from api.auth import get_authenticated_user, get_optional_user, security
+from core.pipeline import get_or_create_summary, get_or_create_transcription, shutdown_background_processing
+from utils.audio import submit_transcription, start_transcription_pool, shutdown_transcription_pool
+from utils.transcript_cache import transcript_cache
+from utils.transcript_compaction import compaction_stats
+from utils.vector_store import warmup_vector_store, ingestion_stats, shutdown_ingestion
+from core.llm_cache import cached_llm_call, llm_cache_bypass, llm_cache_stats
+from core.llm_clients import llm_clients, ainvoke_llm
+from core.llm_router import llm_router
+from core.llm_scheduler import llm_scheduler
+import asyncio
 import logging
-from pathlib import Path
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +39,9 @@ app.include_router(auth.router)
 app.include_router(storage.router)
 app.include_router(chat_history.router)
 app.include_router(chat_query.router)
+app.include_router(transcript_stream.router)
+app.include_router(batch.router)
+app.include_router(summary_stream.router)
 
 
 # Configure CORS
@@ -46,22 +58,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Utility function to save uploaded file temporarily
-def save_upload_file_tmp(upload_file: UploadFile) -> Path:
+
+@app.middleware("http")
+async def llm_cache_control(request: Request, call_next):
+    """Skip LLM cache reads for requests sent with X-LLM-Cache: bypass or Cache-Control: no-cache."""
+    bypass = (
+        request.headers.get("x-llm-cache", "").lower() == "bypass"
+        or "no-cache" in request.headers.get("cache-control", "").lower()
+    )
+    token = llm_cache_bypass.set(bypass)
     try:
-        suffix = Path(upload_file.filename).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            shutil.copyfileobj(upload_file.file, tmp_file)
-            tmp_path = Path(tmp_file.name)
-        return tmp_path
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save uploaded file: {str(e)}"
-        )
+        return await call_next(request)
     finally:
-        upload_file.file.close()
-
+        llm_cache_bypass.reset(token)
 
 @app.get("/", tags=["Root"])
 async def root():
@@ -76,8 +85,8 @@ async def root():
 async def model_check(request: ModelTestRequest):
     """Test LLM model connectivity and functionality."""
     models = {
-        1: ("Google Gemini", create_gemini_llm(), GEMINI_MODEL_NAME),
-        2: ("Groq", create_groq_llm(), GROQ_MODEL_NAME)
+        1: ("Google Gemini", "gemini", create_gemini_llm, GEMINI_MODEL_NAME),
+        2: ("Groq", "groq", create_groq_llm, GROQ_MODEL_NAME)
     }
     
     if request.user_choice not in models:
@@ -91,13 +100,25 @@ async def model_check(request: ModelTestRequest):
             }
         )
     
-    model_name, llm, model_id = models[request.user_choice]
+    model_name, provider, create_llm, model_id = models[request.user_choice]
     
     try:
-        response = llm.invoke(request.query)
+        llm = create_llm()
+
+        async def compute():
+            return (await ainvoke_llm(llm, provider, request.query)).content
+
+        content = await cached_llm_call(
+            provider=provider,
+            model=model_id,
+            temperature=llm.temperature,
+            fingerprint="model-check",
+            payload=request.query,
+            compute=compute
+        )
         return APIResponse(
             status="Success",
-            message=f"{model_name} is working! Response: {response.content[:100]}...",
+            message=f"{model_name} is working! Response: {content[:100]}...",
             model_info={
                 "llm_model": model_id,
                 "whisper_model": WHISPER_MODEL_SIZE,
@@ -122,12 +143,11 @@ async def summarize_audio(
     audio_file: UploadFile = File(..., description="Audio file (.wav, .mp3, .m4a, .flac,.ogg)")):
     
     # Validate file
-    await validate_audio_file(audio_file)
+    audio_bytes = await validate_audio_file(audio_file)
     
-    tmp_file_path = None
     try:
-        tmp_file_path = save_upload_file_tmp(audio_file)
-        summary_response = generate_summary(str(tmp_file_path))
+        transcription = await asyncio.wrap_future(submit_transcription(audio_bytes))
+        summary_response = await summarize_transcript(transcription)
         return summary_response
     except ValueError as ve:
         raise HTTPException(
@@ -139,30 +159,196 @@ async def summarize_audio(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process audio file: {str(e)}"
         )
-    finally:
-        if tmp_file_path and tmp_file_path.exists():
-            try:
-                os.unlink(tmp_file_path)
-            except Exception:
-                pass
 
 @app.post("/transcript", tags=['Transcript'])
 async def get_transcript(audio_file: UploadFile = File(...)):
     
     # Validate file
-    await validate_audio_file(audio_file)
+    audio_bytes = await validate_audio_file(audio_file)
     
-    tmp_file_path = None
     try:
-        tmp_file_path=save_upload_file_tmp(audio_file)
-        transcript_response=transcribe_audio_simple(str(tmp_file_path))
-        return transcript_response
+        transcription=await asyncio.wrap_future(submit_transcription(audio_bytes))
+        return transcription["text"]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process audio file: {str(e)}"
+        )
+
+@app.get("/transcript/cache/stats", tags=['Transcript'])
+async def get_transcript_cache_stats():
+    """Hit/miss counters and occupancy of the transcript cache."""
+    return transcript_cache.stats()
+
+
+@app.get("/transcript/compaction/stats", tags=['Transcript'])
+async def get_transcript_compaction_stats():
+    """Tokens saved by compacting transcripts before summarization."""
+    return compaction_stats()
+
+
+@app.get("/llm/cache/stats", tags=['Model'])
+async def get_llm_cache_stats():
+    """Hit/miss counters and occupancy of the LLM result cache."""
+    return llm_cache_stats()
+
+
+@app.get("/llm/clients/stats", tags=['Model'])
+async def get_llm_client_stats():
+    """Shared LLM clients and their connection pool occupancy."""
+    return llm_clients.stats()
+
+
+@app.get("/llm/router/stats", tags=['Model'])
+async def get_llm_router_stats():
+    """Per-provider latency percentiles, hedge deadlines and failover counts."""
+    return llm_router.stats()
+
+
+@app.get("/llm/scheduler/stats", tags=['Model'])
+async def get_llm_scheduler_stats():
+    """Quota bucket levels, queue depth per priority and admission counts per provider."""
+    return llm_scheduler.stats()
+
+
+@app.get("/vector-store/stats", tags=['Vector Store'])
+async def get_vector_store_stats():
+    """Cumulative ingestion throughput (chunks/s), timings and embedding cache hit rate."""
+    return ingestion_stats()
+
+
+# ---------------- SUMMARIZATION JOBS ---------------- #
+
+def _timestamp(value: float | None) -> datetime | None:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+def _get_job_or_404(job_id: str, user) -> Job:
+    # Another user's job is reported as missing rather than forbidden, so
+    # job ids cannot be probed.
+    job = job_manager.get(job_id, user.id if user else None)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@app.post(
+    "/summarize/jobs",
+    response_model=JobSubmitResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Summarization"]
+)
+async def submit_summary_job(
+    audio_file: UploadFile = File(..., description="Audio file (.wav, .mp3, .m4a, .flac,.ogg)"),
+    user=Depends(get_optional_user)):
+    """
+    Queue an audio file for summarization and return a job ID to poll.
+    Jobs submitted with a bearer token can only be read back with a token
+    for the same user.
+    """
+    audio_bytes = await validate_audio_file(audio_file)
+
+    try:
+        job = await job_manager.submit(audio_bytes, audio_file.filename, user.id if user else None)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/summarize/jobs/{job.id}",
+        result_url=f"/summarize/jobs/{job.id}/result"
+    )
+
+@app.get("/summarize/jobs/{job_id}", response_model=JobStatusResponse, tags=["Summarization"])
+async def get_summary_job(job_id: str, user=Depends(get_optional_user)):
+    """Report the overall and per-stage progress of a summarization job."""
+    job = _get_job_or_404(job_id, user)
+    return JobStatusResponse(
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        stages={
+            name: JobStageStatus(
+                status=stage.status,
+                started_at=_timestamp(stage.started_at),
+                finished_at=_timestamp(stage.finished_at)
+            )
+            for name, stage in job.stages.items()
+        },
+        error=job.error,
+        created_at=_timestamp(job.created_at),
+        finished_at=_timestamp(job.finished_at)
+    )
+
+@app.get("/summarize/jobs/{job_id}/result", response_model=SummaryResponse, tags=["Summarization"])
+async def get_summary_job_result(job_id: str, user=Depends(get_optional_user)):
+    """Return the summary of a completed job."""
+    job = _get_job_or_404(job_id, user)
+    if job.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job failed: {job.error}"
+        )
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is still {job.status}"
+        )
+    return job.result
+
+
+# ---------------- STORED FILES ---------------- #
+
+@app.post("/summarize/{file_id}", response_model=SummaryResponse, tags=["Summarization"])
+async def summarize_stored_audio(
+    file_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user=Depends(get_authenticated_user)):
+    """
+    Summarize an audio file already uploaded through /storage/upload.
+    A persisted summary is returned as-is unless the model or prompt changed.
+    """
+    try:
+        return await get_or_create_summary(file_id, user.id, credentials.credentials)
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
     except Exception as e:
         raise HTTPException(
-            ErrorResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process audio file: {str(e)}"
-        ))
+        )
+
+@app.post("/transcript/{file_id}", tags=['Transcript'])
+async def get_stored_transcript(
+    file_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user=Depends(get_authenticated_user)):
+    """
+    Transcribe an audio file already uploaded through /storage/upload.
+    A persisted transcript is returned as-is unless the Whisper model changed.
+    """
+    try:
+        transcription = await get_or_create_transcription(file_id, user.id, credentials.credentials)
+        return transcription["text"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process audio file: {str(e)}"
+        )
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -185,9 +371,19 @@ async def general_exception_handler(request, exc):
 @app.on_event("startup")
 async def startup_event():
     print(" 🟢 Starting with the Application")
-    pass
+    start_transcription_pool()
+    try:
+        await asyncio.to_thread(warmup_vector_store)
+    except Exception as e:
+        # Chat still works once the store is reachable; it just loads lazily.
+        logger.warning(f"Vector store warmup failed: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     print(" 🛑 Shutting down the Application")
-    pass
\ No newline at end of file
+    await job_manager.shutdown()
+    await shutdown_background_processing()
+    shutdown_transcription_pool()
+    llm_scheduler.shutdown()
+    shutdown_ingestion()
+    await llm_clients.aclose()
\ No newline at end of file
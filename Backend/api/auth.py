@@ -7,10 +7,13 @@ from utils.supabase_client import (
     sign_up_user, sign_in_user, sign_out_user, get_user_from_token
 )
 from utils.auth_helpers import create_user_response
+from typing import Optional
 import logging
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
+# For routes that also serve anonymous callers
+optional_security = HTTPBearer(auto_error=False)
 
 @router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
 async def signup(user_data: UserSignUp):
@@ -144,3 +147,13 @@ async def get_authenticated_user(
             detail="Authentication failed",
             headers={"WWW-Authenticate": "Bearer"}
         )
+
+
+# Dependency for routes open to anonymous callers: None without a token, the
+# user with a valid one, 401 with an invalid one.
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    if credentials is None:
+        return None
+    return await get_authenticated_user(credentials)
@@ -0,0 +1,90 @@
+"""
+Batch Summarization API Endpoint
+Summarize many uploaded or stored audio files in one request and stream the
+results back as newline-delimited JSON as each item finishes.
+"""
+
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from core.batch import BatchItem, BatchPipeline
+from utils.validation import validate_audio_file
+from api.auth import get_authenticated_user, security
+from config import BATCH_MAX_ITEMS
+from typing import List
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/summarize", tags=["Summarization"])
+
+
+async def _upload_loader(audio_file: UploadFile):
+    # Uploads are read before the response starts streaming because FastAPI
+    # closes request files once the endpoint returns.
+    try:
+        audio_bytes = await validate_audio_file(audio_file)
+    except HTTPException as e:
+        error = e
+
+        async def fail() -> bytes:
+            raise error
+        return fail
+
+    async def load() -> bytes:
+        return audio_bytes
+    return load
+
+
+@router.post("/batch")
+async def summarize_batch(
+    audio_files: List[UploadFile] = File(default=[], description="Audio files to summarize"),
+    file_ids: List[str] = Form(default=[], description="IDs of previously uploaded audio files"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user=Depends(get_authenticated_user),
+):
+    """
+    Summarize a batch of audio files.
+
+    Items are processed concurrently with per-stage limits
+    (BATCH_FETCH_CONCURRENCY, BATCH_TRANSCRIBE_CONCURRENCY, BATCH_LLM_CONCURRENCY).
+    The response is ``application/x-ndjson``: one line per item, in completion
+    order, with its ``index``, ``source``, ``name``, ``status`` and either a
+    ``summary`` or an ``error``. A failing item never aborts the rest.
+    Stored files reuse their persisted transcript and summary when fresh, and
+    save whatever is recomputed, as /summarize/{file_id} does.
+    """
+    # Checked before any upload is read into memory.
+    if not audio_files and not file_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide at least one audio file or file_id"
+        )
+    if len(audio_files) + len(file_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items in batch (max {BATCH_MAX_ITEMS})"
+        )
+
+    items = [
+        BatchItem(index=i, source="upload", name=f.filename, load=await _upload_loader(f))
+        for i, f in enumerate(audio_files)
+    ]
+    items += [
+        BatchItem(
+            index=len(items) + i,
+            source="file_id",
+            name=file_id,
+            file_id=file_id,
+        )
+        for i, file_id in enumerate(file_ids)
+    ]
+
+    pipeline = BatchPipeline(user_id=user.id, access_token=credentials.credentials)
+
+    async def stream_results():
+        async for result in pipeline.run(items):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from core.models import ChatQueryRequest, ChatQueryResponse, SourceDocument
 from core.chatbot import process_query
 from api.auth import get_authenticated_user
+from core.llm_scheduler import set_llm_request_context, PRIORITY_CHAT
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,7 @@ async def query_chatbot(
     request: ChatQueryRequest,
     user: dict = Depends(get_authenticated_user)
 ):
+    set_llm_request_context(PRIORITY_CHAT, user.id)
     try:
         chat_history = None
         if request.chat_history:
@@ -21,10 +23,12 @@ async def query_chatbot(
                 {"role": msg.role, "content": msg.content}
                 for msg in request.chat_history
             ]
-        result = process_query(
+        result = await process_query(
             question=request.question,
             chat_history=chat_history,
-            model_choice=request.model_choice or "gemini"
+            model_choice=request.model_choice or "gemini",
+            user_id=user.id,
+            audio_file_ids=request.audio_file_ids
         )
         sources = [
             SourceDocument(
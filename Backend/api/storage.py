@@ -5,7 +5,19 @@ Upload, list, fetch and delete audio files using Supabase Storage + RLS
 
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials
-from core.models import AudioFileMetadata, AudioFileUploadResponse
+from core.models import (
+    AudioFileMetadata,
+    AudioFileUploadResponse,
+    StoredTranscriptResponse,
+    StoredSummaryResponse,
+)
+from core.pipeline import (
+    is_transcript_fresh,
+    is_summary_fresh,
+    schedule_file_processing,
+    PIPELINE_STAGES,
+)
+from utils.db_helpers import get_file_transcript, get_file_summary
 from utils.supabase_client import (
     upload_file_to_storage,
     delete_file_from_storage,
@@ -35,9 +47,15 @@ MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 @router.post("/upload", response_model=AudioFileUploadResponse)
 async def upload_audio_file(
     audio_file: UploadFile = File(...),
+    process: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     user=Depends(get_authenticated_user),
 ):
+    """
+    Upload an audio file. With ``?process=true`` the file is also transcribed,
+    summarized and indexed in the background; progress is recorded in the
+    processing_status / processing_stages columns of its audio_files row.
+    """
     try:
         ext = Path(audio_file.filename).suffix.lower()
         if ext not in ALLOWED_EXTENSIONS:
@@ -73,6 +91,9 @@ async def upload_audio_file(
             "file_size": file_size,
             "created_at": datetime.utcnow().isoformat(),
         }
+        if process:
+            metadata["processing_status"] = "queued"
+            metadata["processing_stages"] = {stage: "pending" for stage in PIPELINE_STAGES}
 
         await insert_record(
             table="audio_files",
@@ -80,11 +101,14 @@ async def upload_audio_file(
             access_token=credentials.credentials,
         )
 
+        if process:
+            schedule_file_processing(file_id, user.id, file_data)
+
         return AudioFileUploadResponse(
             file_id=file_id,
             filename=audio_file.filename,
             storage_url=storage_url,
-            message="File uploaded successfully",
+            message="File uploaded successfully" + (", processing queued" if process else ""),
         )
 
     except HTTPException:
@@ -148,6 +172,57 @@ async def get_file(file_id: str, user=Depends(get_authenticated_user)):
         raise HTTPException(500, "Failed to retrieve file")
 
 
+# ---------------- STORED RESULTS ---------------- #
+
+@router.get("/file/{file_id}/transcript", response_model=StoredTranscriptResponse)
+async def get_file_transcript_record(file_id: str, user=Depends(get_authenticated_user)):
+    try:
+        row = await get_file_transcript(file_id, user.id)
+        if not row:
+            raise HTTPException(404, "Transcript not found")
+
+        return StoredTranscriptResponse(
+            file_id=file_id,
+            text=row["text"],
+            language=row.get("language"),
+            duration=row.get("duration"),
+            segments=row.get("segments") or [],
+            model_version=row["model_version"],
+            stale=not is_transcript_fresh(row),
+            updated_at=row.get("updated_at"),
+        )
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Get transcript failed")
+        raise HTTPException(500, "Failed to retrieve transcript")
+
+
+@router.get("/file/{file_id}/summary", response_model=StoredSummaryResponse)
+async def get_file_summary_record(file_id: str, user=Depends(get_authenticated_user)):
+    try:
+        row = await get_file_summary(file_id, user.id)
+        if not row:
+            raise HTTPException(404, "Summary not found")
+
+        return StoredSummaryResponse(
+            file_id=file_id,
+            summary=row["content"],
+            model_version=row["model_version"],
+            prompt_version=row["prompt_version"],
+            provider=row.get("provider"),
+            stale=not is_summary_fresh(row),
+            updated_at=row.get("updated_at"),
+        )
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Get summary failed")
+        raise HTTPException(500, "Failed to retrieve summary")
+
+
 # ---------------- DELETE ---------------- #
 
 @router.delete("/file/{file_id}")
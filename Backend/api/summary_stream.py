@@ -0,0 +1,92 @@
+"""
+Streaming Summarization Endpoint
+Server-sent events for a single upload: a progress event per pipeline stage,
+then the summary fields as they are parsed from the model's streamed output.
+"""
+
+from fastapi import APIRouter, File, UploadFile
+from fastapi.responses import StreamingResponse
+from core.summarizer import summarize_transcript
+from utils.audio import probe_duration, submit_transcription
+from utils.validation import validate_audio_file
+from typing import Any, Dict
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/summarize", tags=["Summarization"])
+
+_DONE = object()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def summarize_audio_stream(
+    audio_file: UploadFile = File(..., description="Audio file (.wav, .mp3, .m4a, .flac,.ogg)")
+):
+    """
+    Summarize an audio file as a ``text/event-stream``.
+
+    Events, in order:
+    - ``stage`` with ``{"stage": "probed", "duration": ...}`` once the
+      header has been read (the audio is decoded later, during transcription)
+    - ``stage`` with ``{"stage": "transcribed", "language", "duration", "transcript"}``
+    - ``stage`` with ``{"stage": "llm_started"}``
+    - ``field`` with ``{"field": name, "value": ...}`` each time a summary
+      field grows while the model is still generating; the latest value wins
+    - ``summary`` with the validated SummaryResponse
+    - ``error`` with ``{"detail": ...}`` if any stage fails (ends the stream)
+    """
+    # Read before streaming starts: FastAPI closes the upload once we return.
+    audio_bytes = await validate_audio_file(audio_file)
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        task = None
+        try:
+            duration = await asyncio.to_thread(probe_duration, audio_bytes)
+            yield _sse("stage", {"stage": "probed", "duration": duration})
+
+            transcription = await asyncio.wrap_future(submit_transcription(audio_bytes))
+            yield _sse("stage", {
+                "stage": "transcribed",
+                "language": transcription.get("language"),
+                "duration": transcription.get("duration"),
+                "transcript": transcription["text"],
+            })
+
+            yield _sse("stage", {"stage": "llm_started"})
+            sent: Dict[str, Any] = {}
+
+            async def on_partial(partial: Dict[str, Any]):
+                await queue.put(partial)
+
+            task = asyncio.create_task(summarize_transcript(transcription, on_partial))
+            task.add_done_callback(lambda _: queue.put_nowait(_DONE))
+
+            while (partial := await queue.get()) is not _DONE:
+                for field, value in partial.items():
+                    if sent.get(field) != value:
+                        sent[field] = value
+                        yield _sse("field", {"field": field, "value": value})
+
+            summary = task.result()
+            yield _sse("summary", summary.model_dump())
+        except Exception as e:
+            logger.error(f"Streaming summarization failed: {str(e)}")
+            detail = getattr(e, "detail", None) or str(e)
+            yield _sse("error", {"detail": str(detail)})
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
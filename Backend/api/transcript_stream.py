@@ -0,0 +1,241 @@
+"""
+Streaming Transcription Endpoint
+WebSocket that sends transcript segments back as soon as they are decoded,
+either for a whole uploaded file or for audio pushed live during a call.
+"""
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from utils.audio import (
+    WHISPER_SAMPLING_RATE,
+    decode_audio_bytes,
+    split_speech_regions,
+    submit_region,
+    transcription_cache_key,
+)
+from utils.transcript_cache import transcript_cache
+from config import MAX_FILE_SIZE, STREAM_REGION_SECONDS, LIVE_WINDOW_SECONDS
+from collections import Counter
+from typing import Any, Dict, List
+import numpy as np
+import asyncio
+import functools
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/transcript", tags=["Transcript"])
+
+# Live windows are cut at the quietest 20ms frame within this many seconds
+# of the window end, so words are not split across two windows.
+_CUT_SEARCH_SECONDS = 1.0
+_CUT_FRAME_SAMPLES = WHISPER_SAMPLING_RATE // 50
+
+
+def _is_end_message(message: str) -> bool:
+    if message.strip().lower() == "end":
+        return True
+    try:
+        return json.loads(message).get("type") == "end"
+    except (ValueError, AttributeError):
+        return False
+
+
+def _pcm16_to_float(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _cancel_all(futures: List[asyncio.Future]):
+    # Regions not yet picked up by a worker are dropped from the pool queue.
+    for future in futures:
+        if not future.done():
+            future.cancel()
+
+
+def _quiet_cut_point(buffer: np.ndarray, window: int) -> int:
+    search = int(_CUT_SEARCH_SECONDS * WHISPER_SAMPLING_RATE)
+    start = max(window - search, 0)
+    frames = buffer[start:window]
+    usable = len(frames) // _CUT_FRAME_SAMPLES * _CUT_FRAME_SAMPLES
+    if usable == 0:
+        return window
+    energy = np.square(frames[:usable]).reshape(-1, _CUT_FRAME_SAMPLES).mean(axis=1)
+    return start + int(np.argmin(energy)) * _CUT_FRAME_SAMPLES + _CUT_FRAME_SAMPLES
+
+
+async def _send_segments(websocket: WebSocket, segments: List[Dict[str, Any]]):
+    for segment in segments:
+        await websocket.send_json({"type": "segment", **segment})
+
+
+async def _emit_in_order(websocket: WebSocket, futures: asyncio.Queue, collected: List[Dict[str, Any]]):
+    """Send each region's segments as soon as it and every region before it are done."""
+    while True:
+        future = await futures.get()
+        if future is None:
+            return
+        result = await future
+        collected.append(result)
+        await _send_segments(websocket, result["segments"])
+
+
+def _assemble(results: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Combine per-region results into the same shape submit_transcription returns."""
+    segments = [segment for result in results for segment in result["segments"]]
+    languages = Counter(result["language"] for result in results if result["segments"])
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "language": languages.most_common(1)[0][0] if languages else None,
+        "duration": duration,
+        "segments": segments,
+    }
+
+
+async def _send_done(websocket: WebSocket, transcription: Dict[str, Any]):
+    await websocket.send_json({
+        "type": "done",
+        **{k: v for k, v in transcription.items() if k != "segments"},
+    })
+
+
+async def _stream_file(websocket: WebSocket):
+    """Receive an encoded file in chunks, then stream its regions as they finish."""
+    chunks = []
+    size = 0
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes"):
+            size += len(message["bytes"])
+            if size > MAX_FILE_SIZE:
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.0f}MB"
+                })
+                return
+            chunks.append(message["bytes"])
+        elif message.get("text") and _is_end_message(message["text"]):
+            break
+
+    audio_bytes = b"".join(chunks)
+    loop = asyncio.get_running_loop()
+    # Keyed apart from submit_transcription's results: streaming always splits
+    # on VAD into shorter regions, so its text can differ for the same audio.
+    cache_key = await loop.run_in_executor(
+        None, functools.partial(transcription_cache_key, audio_bytes, stream=True)
+    )
+    cached = await loop.run_in_executor(None, transcript_cache.get, cache_key)
+    if cached is not None:
+        await _send_segments(websocket, cached["segments"])
+        await _send_done(websocket, cached)
+        return
+
+    samples = await loop.run_in_executor(None, decode_audio_bytes, audio_bytes)
+    await websocket.send_json({"type": "decoded", "duration": len(samples) / WHISPER_SAMPLING_RATE})
+    regions = await loop.run_in_executor(None, split_speech_regions, samples, STREAM_REGION_SECONDS)
+
+    # Every region is queued at once so the pool works on them in parallel;
+    # results are still sent strictly in call order.
+    futures = [
+        asyncio.wrap_future(submit_region(samples[start:end], start / WHISPER_SAMPLING_RATE))
+        for start, end in regions
+    ]
+    results = []
+    try:
+        for future in futures:
+            result = await future
+            results.append(result)
+            await _send_segments(websocket, result["segments"])
+    finally:
+        _cancel_all(futures)
+
+    # Cached so streaming the same file again replays the stored segments.
+    transcription = _assemble(results, len(samples) / WHISPER_SAMPLING_RATE)
+    await loop.run_in_executor(None, transcript_cache.set, cache_key, transcription)
+    await _send_done(websocket, transcription)
+
+
+async def _stream_live(websocket: WebSocket):
+    """Receive raw 16 kHz mono PCM16 during a call and transcribe it window by window."""
+    window = int(LIVE_WINDOW_SECONDS * WHISPER_SAMPLING_RATE)
+    buffer = np.zeros(0, dtype=np.float32)
+    # A frame may end mid-sample; its odd byte is prepended to the next frame.
+    remainder = b""
+    offset = 0
+    pending: asyncio.Queue = asyncio.Queue()
+    submitted: List[asyncio.Future] = []
+    results: List[Dict[str, Any]] = []
+    emitter = asyncio.create_task(_emit_in_order(websocket, pending, results))
+
+    def _flush(samples: np.ndarray, start: int):
+        future = asyncio.wrap_future(submit_region(samples, start / WHISPER_SAMPLING_RATE, vad_filter=True))
+        submitted.append(future)
+        pending.put_nowait(future)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                data = remainder + message["bytes"]
+                usable = len(data) - len(data) % 2
+                remainder = data[usable:]
+                buffer = np.concatenate([buffer, _pcm16_to_float(data[:usable])])
+                while len(buffer) >= window:
+                    cut = _quiet_cut_point(buffer, window)
+                    _flush(buffer[:cut], offset)
+                    buffer = buffer[cut:]
+                    offset += cut
+            elif message.get("text") and _is_end_message(message["text"]):
+                break
+
+        if len(buffer):
+            _flush(buffer, offset)
+        pending.put_nowait(None)
+        await emitter
+        await _send_done(websocket, _assemble(results, (offset + len(buffer)) / WHISPER_SAMPLING_RATE))
+    finally:
+        if not emitter.done():
+            emitter.cancel()
+        _cancel_all(submitted)
+
+
+@router.websocket("/stream")
+async def stream_transcript(websocket: WebSocket, mode: str = "file"):
+    """
+    Stream transcript segments over a WebSocket.
+
+    Modes:
+        file: send an encoded audio file as binary messages, then the text
+              message "end"; segments arrive as each speech region is decoded.
+        live: send raw 16 kHz mono PCM16 as binary messages during the call
+              and "end" when it is over; segments arrive every
+              LIVE_WINDOW_SECONDS or so.
+
+    Server messages are JSON objects with a ``type`` of ``segment``
+    (start, end, text), ``decoded``, ``done`` (text, language, duration)
+    or ``error`` (detail).
+    """
+    await websocket.accept()
+    try:
+        if mode == "live":
+            await _stream_live(websocket)
+        elif mode == "file":
+            await _stream_file(websocket)
+        else:
+            await websocket.send_json({"type": "error", "detail": "mode must be 'file' or 'live'"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("Transcript stream client disconnected")
+    except Exception as e:
+        logger.error(f"Transcript stream error: {str(e)}")
+        # The failure may have been the socket itself going away.
+        if websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                await websocket.close(code=1011)
+            except Exception:
+                pass
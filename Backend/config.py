@@ -11,8 +11,11 @@ GEMINI_API_KEY = os.getenv("Gemini_API_Key")
 if not GEMINI_API_KEY:
     raise EnvironmentError("Gemini_API_Key not found in .env file")
 
+# "pinecone" | "local" (embedded on-disk index, see utils/local_vector_store.py)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+
 PINECONE_API_KEY = os.getenv("Pinecone_API_Key")
-if not PINECONE_API_KEY:
+if VECTOR_STORE_BACKEND == "pinecone" and not PINECONE_API_KEY:
     raise EnvironmentError("Pinecone_API_Key not found in .env file")
 
 GEMINI_MODEL_NAME = "gemini-2.5-flash"
@@ -21,14 +24,108 @@ GEMINI_TEMPERATURE = 0.7
 GROQ_MODEL_NAME = "qwen/qwen3-32b"
 GROQ_TEMPERATURE = 0.6
 
+# Max in-flight requests per LLM provider, shared by summaries and chat
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+# Of those, slots only chat may use, so chat never waits behind summaries
+LLM_CHAT_RESERVED_SLOTS = int(os.getenv("LLM_CHAT_RESERVED_SLOTS", "2"))
+
+# Provider quotas (requests and tokens per minute) enforced by the LLM scheduler
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "1000"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GROQ_RPM = int(os.getenv("GROQ_RPM", "1000"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "300000"))
+# Output tokens assumed per call when estimating its cost up front
+LLM_OUTPUT_TOKEN_ESTIMATE = 1024
+
+# Hedging / failover between Gemini and Groq
+LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "true").lower() == "true"
+LLM_HEDGE_QUANTILE = 0.95
+LLM_HEDGE_MIN_SAMPLES = 20  # below this the default delay is used
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "20"))
+LLM_HEDGE_MIN_DELAY_SECONDS = 2.0
+LLM_LATENCY_WINDOW = 500
+
 WHISPER_MODEL_SIZE = "medium"
+# Transcription runs in a pool of worker processes, each holding its own model.
+# Keep WHISPER_POOL_SIZE * WHISPER_CPU_THREADS close to the number of cores.
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "4"))
+WHISPER_POOL_SIZE = int(os.getenv(
+    "WHISPER_POOL_SIZE", str(max(1, (os.cpu_count() or 1) // WHISPER_CPU_THREADS))
+))
+
+# Long-audio mode: calls at least this long are split on silence with VAD and
+# their speech regions transcribed in parallel across the worker pool.
+LONG_AUDIO_MIN_SECONDS = 5 * 60
+LONG_AUDIO_REGION_SECONDS = 30
+VAD_MIN_SILENCE_MS = 500
+VAD_SPEECH_PAD_MS = 200
+# Speech chunks further apart than this start a new region, so long silences
+# are dropped rather than transcribed inside a region
+VAD_MAX_REGION_GAP_MS = 2 * VAD_MIN_SILENCE_MS
+
+# Streaming transcription (WebSocket /transcript/stream)
+STREAM_REGION_SECONDS = 15
+LIVE_WINDOW_SECONDS = 10
+
+# Transcript Cache (keyed by audio content hash + transcription settings)
+TRANSCRIPT_CACHE_MEMORY_ENTRIES = 256
+TRANSCRIPT_CACHE_DIR = os.getenv(
+    "TRANSCRIPT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache", "transcripts")
+)
+TRANSCRIPT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+# LLM Result Cache (keyed by provider, model, temperature, prompt and input hash)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")  # "sqlite" | "memory" | "none"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = 10000
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache", "llm_cache.sqlite3")
+)
+
+# Shared LLM client connection pool
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS = 60
+LLM_HTTP_TIMEOUT_SECONDS = 120
 
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 50
 TEXT_SEPARATORS = ["\n\n", "\n", ".", " "]
 
+# Map-reduce summarization for transcripts above the token threshold
+TOKENIZER_ENCODING = "cl100k_base"
+SUMMARY_MAP_REDUCE_TOKEN_THRESHOLD = int(os.getenv("SUMMARY_MAP_REDUCE_TOKEN_THRESHOLD", "12000"))
+SUMMARY_MAP_CHUNK_TOKENS = 4000
+SUMMARY_MAP_CHUNK_OVERLAP_TOKENS = 200
+SUMMARY_MAP_CONCURRENCY = 8
+
+# Transcript compaction before prompting
+TRANSCRIPT_COMPACTION_ENABLED = os.getenv("TRANSCRIPT_COMPACTION_ENABLED", "true").lower() == "true"
+# Hard cap on transcript/notes tokens in any single summarization call
+SUMMARY_CALL_TOKEN_BUDGET = int(os.getenv("SUMMARY_CALL_TOKEN_BUDGET", "16000"))
+
 EMBEDDINGS_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDINGS_DIMENSION = 384
+EMBEDDINGS_MAX_SEQ_LENGTH = 256
+
+# "torch" runs the model through sentence-transformers; "onnx" runs its int8
+# ONNX export on ONNX Runtime without loading PyTorch
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "torch")
+ONNX_EMBEDDINGS_FILE = os.getenv("ONNX_EMBEDDINGS_FILE", "onnx/model_quint8_avx2.onnx")
+ONNX_EMBEDDINGS_THREADS = int(os.getenv("ONNX_EMBEDDINGS_THREADS", "0"))  # 0 = ONNX Runtime default
+ONNX_EMBEDDINGS_BATCH_SIZE = 32
+ONNX_QUERY_BATCH_WAIT_MS = float(os.getenv("ONNX_QUERY_BATCH_WAIT_MS", "5"))
+
+# Embedding cache keyed by chunk text hash; cleared when the model changes
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache", "embeddings")
+)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
 
 PINECONE_INDEX_NAME = "convox-ai"
 PINECONE_DIMENSION = EMBEDDINGS_DIMENSION
@@ -36,6 +133,30 @@ PINECONE_METRIC = "cosine"
 PINECONE_CLOUD = "aws"
 PINECONE_REGION = "us-east-1"
 
+# Local vector store: exact search up to LOCAL_VECTOR_EXACT_MAX_ROWS vectors per
+# namespace, IVF approximate search above it
+LOCAL_VECTOR_STORE_DIR = os.getenv(
+    "LOCAL_VECTOR_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_store")
+)
+LOCAL_VECTOR_EXACT_MAX_ROWS = int(os.getenv("LOCAL_VECTOR_EXACT_MAX_ROWS", "50000"))
+LOCAL_VECTOR_IVF_PROBES = int(os.getenv("LOCAL_VECTOR_IVF_PROBES", "8"))
+LOCAL_VECTOR_IVF_ITERATIONS = 10
+LOCAL_VECTOR_IVF_REBUILD_GROWTH = 2.0  # retrain k-means once a namespace doubles
+
+# Per-namespace index version, bumped on every ingestion; part of the chat
+# answer cache key so new calls invalidate cached answers
+VECTOR_INDEX_VERSION_PATH = os.getenv(
+    "VECTOR_INDEX_VERSION_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache", "index_versions.sqlite3")
+)
+
+# Ingestion: chunks are embedded in batches while earlier batches are upserted
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+INGEST_UPSERT_CONCURRENCY = int(os.getenv("INGEST_UPSERT_CONCURRENCY", "4"))
+INGEST_UPSERT_RETRIES = 3
+INGEST_RETRY_BACKOFF_SECONDS = 1.0
+
 RETRIEVER_SEARCH_TYPE = "similarity"
 RETRIEVER_TOP_K = 5
 
@@ -58,3 +179,24 @@ ALLOWED_AUDIO_MIME_TYPES = {
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 AUDIO_BUCKET_NAME = "audio-files"
 
+# Batch Summarization (per-stage concurrency limits)
+BATCH_MAX_ITEMS = 500
+BATCH_FETCH_CONCURRENCY = 8
+BATCH_TRANSCRIBE_CONCURRENCY = int(os.getenv("BATCH_TRANSCRIBE_CONCURRENCY", str(WHISPER_POOL_SIZE)))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Files fetched but not yet transcribed, per batch; bounds the memory held by
+# downloads waiting for a Whisper slot
+BATCH_READ_AHEAD = int(os.getenv("BATCH_READ_AHEAD", str(2 * BATCH_TRANSCRIBE_CONCURRENCY)))
+
+# Background processing of uploads (/storage/upload?process=true)
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "2"))
+
+# Summarization Job Queue
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "2"))
+JOB_QUEUE_MAX_SIZE = 100
+JOB_RESULT_TTL_SECONDS = 60 * 60
+# Queued job audio is written here rather than held in memory until it runs
+JOB_SPOOL_DIR = os.getenv(
+    "JOB_SPOOL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs")
+)
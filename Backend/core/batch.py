@@ -0,0 +1,104 @@
+"""
+Batch Summarization Pipeline
+Pipelines fetch, transcription and LLM stages across many audio files with a
+separate concurrency limit per stage, yielding each result as it finishes.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.models import SummaryResponse
+from core.summarizer import summarize_transcript_served
+from core.pipeline import get_or_create_summary
+from core.llm_scheduler import set_llm_request_context, PRIORITY_SUMMARY
+from utils.audio import submit_transcription
+from config import (
+    BATCH_FETCH_CONCURRENCY,
+    BATCH_TRANSCRIBE_CONCURRENCY,
+    BATCH_LLM_CONCURRENCY,
+    BATCH_READ_AHEAD,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    index: int
+    source: str  # "upload" | "file_id"
+    name: str
+    load: Optional[Callable[[], Awaitable[bytes]]] = None  # uploads
+    file_id: Optional[str] = None  # stored files, which reuse and persist their results
+
+
+class BatchPipeline:
+    """
+    Every item runs fetch -> transcribe -> summarize in its own task, and each
+    stage is gated by its own semaphore. While one item waits on the LLM the
+    next ones are already being transcribed, so throughput is bounded by the
+    Whisper pool and provider quota rather than by request round-trips.
+    """
+
+    def __init__(
+        self,
+        fetch_concurrency: int = BATCH_FETCH_CONCURRENCY,
+        transcribe_concurrency: int = BATCH_TRANSCRIBE_CONCURRENCY,
+        llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+        read_ahead: int = BATCH_READ_AHEAD,
+        user_id: Optional[str] = None,
+        access_token: Optional[str] = None,
+    ):
+        self.user_id = user_id
+        self.access_token = access_token
+        # Taken before a fetch and held until its transcription finishes, so
+        # at most read_ahead downloaded files wait in memory for Whisper.
+        self._read_ahead = asyncio.Semaphore(max(read_ahead, transcribe_concurrency))
+        self._fetch = asyncio.Semaphore(fetch_concurrency)
+        self._transcribe = asyncio.Semaphore(transcribe_concurrency)
+        self._llm = asyncio.Semaphore(llm_concurrency)
+
+    async def _transcribe_loaded(self, load: Callable[[], Awaitable[bytes]]) -> Dict[str, Any]:
+        async with self._read_ahead:
+            # Downloads run ahead of Whisper so a free transcription slot
+            # rarely waits on a fetch.
+            async with self._fetch:
+                audio_bytes = await load()
+            async with self._transcribe:
+                return await asyncio.wrap_future(submit_transcription(audio_bytes))
+
+    async def _summarize(self, transcription: Dict[str, Any]) -> Tuple[SummaryResponse, Optional[str]]:
+        async with self._llm:
+            return await summarize_transcript_served(transcription)
+
+    async def _process(self, item: BatchItem) -> Dict[str, Any]:
+        result = {"index": item.index, "source": item.source, "name": item.name}
+        set_llm_request_context(PRIORITY_SUMMARY, self.user_id)
+        try:
+            if item.file_id is not None:
+                summary = await get_or_create_summary(
+                    item.file_id,
+                    self.user_id,
+                    self.access_token,
+                    transcribe=self._transcribe_loaded,
+                    summarize=self._summarize,
+                )
+            else:
+                summary, _ = await self._summarize(await self._transcribe_loaded(item.load))
+            result.update(status="completed", summary=summary.model_dump())
+        except Exception as e:
+            logger.error(f"Batch item {item.index} ({item.name}) failed: {str(e)}")
+            detail = getattr(e, "detail", None) or str(e)
+            result.update(status="failed", error=str(detail))
+        return result
+
+    async def run(self, items: List[BatchItem]) -> AsyncIterator[Dict[str, Any]]:
+        tasks = [asyncio.create_task(self._process(item)) for item in items]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
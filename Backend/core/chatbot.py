@@ -1,41 +1,41 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
 from langchain_classic.chains import ConversationalRetrievalChain
 from langchain_core.prompts import PromptTemplate
 from core.prompts.templates import CHATBOT_PROMPT
-from utils.vector_store import get_retriever
+from utils.vector_store import get_retriever, get_index_version, user_namespace
+from core.llm_cache import cached_llm_call, prompt_fingerprint
+from core.llm_clients import get_llm, ainvoke_llm, estimate_llm_tokens, routed_model_key
+from core.llm_router import llm_router
 from typing import List, Dict, Optional
+import asyncio
 from config import (
-    GEMINI_API_KEY, 
-    GEMINI_MODEL_NAME, 
-    GEMINI_TEMPERATURE,
-    GROQ_API_KEY,
-    GROQ_MODEL_NAME,
-    GROQ_TEMPERATURE
+    RETRIEVER_TOP_K,
+    CHUNK_SIZE
 )
 
 chatbot_prompt_template = PromptTemplate.from_template(
     template=CHATBOT_PROMPT
 )
 
+CHATBOT_PROMPT_FINGERPRINT = prompt_fingerprint(CHATBOT_PROMPT)
+
+# Retrieved chunks are added to the prompt inside the chain; CHUNK_SIZE is in
+# characters, at roughly four characters per token.
+RETRIEVED_CONTEXT_TOKEN_ESTIMATE = RETRIEVER_TOP_K * CHUNK_SIZE // 4
+
 def create_chatbot_llm(model_choice: str = "gemini"):
     if model_choice.lower() == "groq":
-        return ChatGroq(
-            model=GROQ_MODEL_NAME,
-            api_key=GROQ_API_KEY,
-            temperature=GROQ_TEMPERATURE
-        )
+        return get_llm("groq")
     else:
-        return ChatGoogleGenerativeAI(
-            model=GEMINI_MODEL_NAME,
-            api_key=GEMINI_API_KEY,
-            temperature=GEMINI_TEMPERATURE
-        )
+        return get_llm("gemini")
 
 
-def create_chatbot_chain(model_choice: str = "gemini"):
+def create_chatbot_chain(
+    model_choice: str = "gemini",
+    user_id: Optional[str] = None,
+    filter: Optional[Dict[str, any]] = None
+):
     llm = create_chatbot_llm(model_choice)
-    retriever = get_retriever()
+    retriever = get_retriever(user_id, filter)
     chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
         retriever=retriever,
@@ -46,13 +46,47 @@ def create_chatbot_chain(model_choice: str = "gemini"):
     
     return chain
 
-def process_query(
+async def process_query(
     question: str,
     chat_history: Optional[List[Dict[str, str]]] = None,
-    model_choice: str = "gemini"
+    model_choice: str = "gemini",
+    user_id: Optional[str] = None,
+    audio_file_ids: Optional[List[str]] = None
+) -> Dict[str, any]:
+    if user_id is None:
+        raise ValueError("user_id is required to search the user's calls")
+    filter = {"audio_file_id": {"$in": audio_file_ids}} if audio_file_ids else None
+    index_version = await asyncio.to_thread(get_index_version, user_namespace(user_id))
+    # Like summaries, keyed on the operation rather than a provider since the
+    # router may fail over; model_choice is part of the payload instead.
+    return await cached_llm_call(
+        provider="chat",
+        model=routed_model_key(),
+        temperature=None,
+        fingerprint=CHATBOT_PROMPT_FINGERPRINT,
+        # Answers come from the user's own calls, so they are cached per user
+        # and per version of the user's index: ingesting a new call changes
+        # what retrieval returns, so earlier answers no longer apply.
+        payload={
+            "question": question,
+            "chat_history": chat_history or [],
+            "model_choice": model_choice.lower(),
+            "user_id": user_id,
+            "filter": filter,
+            "index_version": index_version,
+        },
+        compute=lambda: _process_query_uncached(question, chat_history, model_choice, user_id, filter)
+    )
+
+
+async def _process_query_uncached(
+    question: str,
+    chat_history: Optional[List[Dict[str, str]]],
+    model_choice: str,
+    user_id: str,
+    filter: Optional[Dict[str, any]]
 ) -> Dict[str, any]:
     try:
-        chain = create_chatbot_chain(model_choice)
         formatted_history = []
         if chat_history:
             for msg in chat_history:
@@ -60,10 +94,16 @@ def process_query(
                     formatted_history.append(("human", msg["content"]))
                 elif msg["role"] == "assistant":
                     formatted_history.append(("ai", msg["content"]))
-        result = chain({
-            "question": question,
-            "chat_history": formatted_history
-        })
+        primary = "groq" if model_choice.lower() == "groq" else "gemini"
+
+        inputs = {"question": question, "chat_history": formatted_history}
+        estimated_tokens = estimate_llm_tokens(inputs) + RETRIEVED_CONTEXT_TOKEN_ESTIMATE
+
+        async def call(provider: str):
+            chain = create_chatbot_chain(provider, user_id, filter)
+            return await ainvoke_llm(chain, provider, inputs, estimated_tokens)
+
+        result, provider = await llm_router.route("chat", call, primary)
         sources = []
         if "source_documents" in result:
             for doc in result["source_documents"]:
@@ -75,12 +115,16 @@ def process_query(
         return {
             "answer": result["answer"],
             "sources": sources,
-            "model_used": model_choice
+            "model_used": provider
         }
         
     except Exception as e:
         raise
 
 
-def query_without_history(question: str, model_choice: str = "gemini") -> Dict[str, any]:
-    return process_query(question, chat_history=None, model_choice=model_choice)
\ No newline at end of file
+async def query_without_history(
+    question: str,
+    model_choice: str = "gemini",
+    user_id: Optional[str] = None
+) -> Dict[str, any]:
+    return await process_query(question, chat_history=None, model_choice=model_choice, user_id=user_id)
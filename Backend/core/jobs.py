@@ -0,0 +1,186 @@
+"""
+Summarization Job Queue
+Runs the transcription and LLM stages of a summary off the request with
+bounded concurrency and keeps per-stage progress for polling.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from core.summarizer import summarize_transcript
+from utils.audio import submit_transcription
+from config import JOB_MAX_CONCURRENCY, JOB_QUEUE_MAX_SIZE, JOB_RESULT_TTL_SECONDS, JOB_SPOOL_DIR
+
+logger = logging.getLogger(__name__)
+
+JOB_STAGES = ("transcription", "summarization")
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already waiting or running."""
+
+
+@dataclass
+class JobStage:
+    status: str = "pending"  # pending | running | completed | failed
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    user_id: Optional[str] = None  # submitter, if authenticated
+    status: str = "queued"  # queued | running | completed | failed
+    stages: Dict[str, JobStage] = field(
+        default_factory=lambda: {name: JobStage() for name in JOB_STAGES}
+    )
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def visible_to(self, user_id: Optional[str]) -> bool:
+        """Jobs submitted with a token are only visible to that same user."""
+        return self.user_id is None or self.user_id == user_id
+
+    def start_stage(self, name: str):
+        self.stages[name].status = "running"
+        self.stages[name].started_at = time.time()
+
+    def finish_stage(self, name: str, status: str = "completed"):
+        self.stages[name].status = status
+        self.stages[name].finished_at = time.time()
+
+
+class JobManager:
+    """
+    In-process job registry. Each job is an asyncio task that holds a slot of
+    the concurrency semaphore, sends transcription to the Whisper worker pool
+    and awaits the LLM stage natively, so a queued summary costs a coroutine
+    rather than a thread. Queued audio is spooled to JOB_SPOOL_DIR instead of
+    being held in memory, and deleted once the job finishes.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = JOB_MAX_CONCURRENCY,
+        max_queue_size: int = JOB_QUEUE_MAX_SIZE,
+        result_ttl: int = JOB_RESULT_TTL_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    @staticmethod
+    def _spool(audio_bytes: bytes, filename: str) -> str:
+        os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=JOB_SPOOL_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio_bytes)
+        return path
+
+    async def submit(self, audio_bytes: bytes, filename: str, user_id: Optional[str] = None) -> Job:
+        """
+        Queue a summarization job for an uploaded audio file.
+
+        Raises:
+            JobQueueFullError: If the queue is already at capacity
+        """
+        self._purge_expired()
+        if self.pending_count() >= self.max_queue_size:
+            raise JobQueueFullError(
+                f"Job queue is full ({self.max_queue_size} jobs pending)"
+            )
+
+        job = Job(id=str(uuid.uuid4()), filename=filename, user_id=user_id)
+        # Registered before spooling so concurrent submits count it.
+        self._jobs[job.id] = job
+        try:
+            audio_path = await asyncio.to_thread(self._spool, audio_bytes, filename)
+        except Exception:
+            del self._jobs[job.id]
+            raise
+        task = asyncio.create_task(self._run(job, audio_path))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Job]:
+        """The job, or None if it does not exist or belongs to another user."""
+        self._purge_expired()
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.visible_to(user_id) else None
+
+    async def _run_stage(self, job: Job, stage: str, awaitable):
+        job.start_stage(stage)
+        try:
+            result = await awaitable
+        except Exception:
+            job.finish_stage(stage, "failed")
+            raise
+        job.finish_stage(stage)
+        return result
+
+    async def _run(self, job: Job, audio_path: str):
+        try:
+            async with self._get_semaphore():
+                job.status = "running"
+                transcription = await self._run_stage(
+                    job, "transcription",
+                    asyncio.wrap_future(submit_transcription(audio_path))
+                )
+                summary = await self._run_stage(
+                    job, "summarization",
+                    summarize_transcript(transcription)
+                )
+                job.result = summary.model_dump()
+                job.status = "completed"
+        except Exception as e:
+            logger.error(f"Summarization job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+job_manager = JobManager()
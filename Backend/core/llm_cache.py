@@ -0,0 +1,219 @@
+"""
+LLM Result Cache
+Caches LLM results keyed by provider, model, temperature, a fingerprint of the
+prompt template and a hash of the input, with in-memory and SQLite backends.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import (
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# Set per request from the X-LLM-Cache / Cache-Control headers. When true the
+# cache is not read, but the fresh result still replaces the stored one.
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def prompt_fingerprint(*templates: str) -> str:
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def make_llm_cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    fingerprint: str,
+    payload: Any,
+) -> str:
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, sort_keys=True, default=str)
+    input_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{temperature}:{fingerprint}:{input_hash}"
+
+
+class MemoryLLMCache:
+    """Process-local LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: int = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteLLMCache:
+    """Persistent cache shared by every worker process on the host."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: int = LLM_CACHE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "bypassed": 0}
+
+
+def get_llm_cache():
+    """Return the configured cache backend, or None when LLM_CACHE_BACKEND is "none"."""
+    global _cache
+    with _cache_lock:
+        if _cache is None and LLM_CACHE_BACKEND != "none":
+            if LLM_CACHE_BACKEND == "sqlite":
+                _cache = SQLiteLLMCache()
+            else:
+                _cache = MemoryLLMCache()
+        return _cache
+
+
+async def cached_llm_call(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    fingerprint: str,
+    payload: Any,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Return the cached result for this provider/model/prompt/input, or await
+    ``compute()`` and cache what it returns. Results must be JSON-serializable.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return await compute()
+
+    key = make_llm_cache_key(provider, model, temperature, fingerprint, payload)
+    if llm_cache_bypass.get():
+        _counters["bypassed"] += 1
+    else:
+        try:
+            cached = await asyncio.to_thread(cache.get, key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            cached = None
+        if cached is not None:
+            _counters["hits"] += 1
+            return cached
+        _counters["misses"] += 1
+
+    value = await compute()
+    try:
+        await asyncio.to_thread(cache.set, key, value)
+    except Exception as e:
+        logger.warning(f"LLM cache store failed: {str(e)}")
+    return value
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    cache = get_llm_cache()
+    return {
+        "backend": LLM_CACHE_BACKEND,
+        **_counters,
+        "entries": len(cache) if cache is not None else 0,
+        "max_entries": LLM_CACHE_MAX_ENTRIES,
+        "ttl_seconds": LLM_CACHE_TTL_SECONDS,
+    }
@@ -0,0 +1,224 @@
+"""
+LLM Client Registry
+Process-wide, lazily created LLM clients keyed by provider and settings so
+that every request reuses the same keep-alive connections.
+"""
+
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_groq import ChatGroq
+
+from core.llm_scheduler import llm_scheduler
+from utils.text_processing import count_tokens
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL_NAME,
+    GEMINI_TEMPERATURE,
+    GROQ_API_KEY,
+    GROQ_MODEL_NAME,
+    GROQ_TEMPERATURE,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_HTTP_TIMEOUT_SECONDS,
+    LLM_OUTPUT_TOKEN_ESTIMATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Set by the router around each attempt; called once the call holds a slot,
+# so latency and hedge deadlines exclude time spent queued locally.
+llm_call_started: ContextVar[Optional[Callable[[], None]]] = ContextVar("llm_call_started", default=None)
+
+LLM_PROVIDERS = {
+    "gemini": (GEMINI_MODEL_NAME, GEMINI_TEMPERATURE),
+    "groq": (GROQ_MODEL_NAME, GROQ_TEMPERATURE),
+}
+
+
+def _pool_stats(client: Optional[Any]) -> Dict[str, int]:
+    # httpx does not expose pool occupancy publicly; read it from httpcore.
+    if client is None:
+        return {"connections": 0, "idle": 0}
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+    }
+
+
+class LLMClientRegistry:
+    """
+    Holds one chat model per (provider, model, temperature). Groq clients share
+    a sync and an async httpx pool; Gemini clients keep their own gRPC channel,
+    which is reused for as long as the client instance lives here.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, float], BaseChatModel] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._created = 0
+        self._reused = 0
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+    def _get_http_clients(self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS
+            )
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(
+                limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS
+            )
+        return self._http_client, self._http_async_client
+
+    def _create(self, provider: str, model: str, temperature: float) -> BaseChatModel:
+        if provider == "groq":
+            http_client, http_async_client = self._get_http_clients()
+            return ChatGroq(
+                model=model,
+                api_key=GROQ_API_KEY,
+                temperature=temperature,
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+        if provider == "gemini":
+            return ChatGoogleGenerativeAI(
+                model=model,
+                api_key=GEMINI_API_KEY,
+                temperature=temperature
+            )
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    def get(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+    ) -> BaseChatModel:
+        """
+        Return the shared client for a provider, creating it on first use.
+
+        Args:
+            provider: "gemini" or "groq"
+            model: Model name (defaults to the provider's configured model)
+            temperature: Sampling temperature (defaults to the configured one)
+
+        Returns:
+            Chat model instance shared across requests
+        """
+        provider = provider.lower()
+        if provider not in LLM_PROVIDERS:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+        default_model, default_temperature = LLM_PROVIDERS[provider]
+        key = (
+            provider,
+            model or default_model,
+            default_temperature if temperature is None else temperature,
+        )
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._reused += 1
+                return client
+            client = self._create(*key)
+            self._clients[key] = client
+            self._created += 1
+            logger.info(f"Created {provider} client for {key[1]} (temperature={key[2]})")
+            return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": [
+                    {"provider": p, "model": m, "temperature": t}
+                    for p, m, t in self._clients
+                ],
+                "created": self._created,
+                "reused": self._reused,
+                "http_pool": {
+                    "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+                    "max_keepalive_connections": LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    "sync": _pool_stats(self._http_client),
+                    "async": _pool_stats(self._http_async_client),
+                },
+            }
+
+    async def aclose(self):
+        with self._lock:
+            self._clients.clear()
+            http_client, self._http_client = self._http_client, None
+            http_async_client, self._http_async_client = self._http_async_client, None
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+
+llm_clients = LLMClientRegistry()
+
+
+def get_llm(provider: str, model: Optional[str] = None, temperature: Optional[float] = None) -> BaseChatModel:
+    return llm_clients.get(provider, model, temperature)
+
+
+def routed_model_key() -> str:
+    """
+    Cache-key model string for calls the router may serve from any provider:
+    every provider's model and temperature, since the key cannot know which
+    one will answer.
+    """
+    return "+".join(f"{provider}/{model}@{temperature}" for provider, (model, temperature) in LLM_PROVIDERS.items())
+
+
+def estimate_llm_tokens(llm_input: Any) -> int:
+    """Prompt tokens of llm_input plus the expected output, for quota accounting."""
+    text = llm_input if isinstance(llm_input, str) else json.dumps(llm_input, default=str)
+    return count_tokens(text) + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+@asynccontextmanager
+async def llm_slot(provider: str, estimated_tokens: int) -> AsyncIterator[None]:
+    """
+    Hold one of the provider's concurrency slots, admitted by the quota
+    scheduler in priority order (chat ahead of summaries).
+    """
+    await llm_scheduler.acquire(provider, estimated_tokens)
+    try:
+        yield
+    finally:
+        llm_scheduler.release(provider)
+
+
+async def ainvoke_llm(
+    runnable: Any,
+    provider: str,
+    llm_input: Any,
+    estimated_tokens: Optional[int] = None,
+) -> Any:
+    """Await ``runnable.ainvoke`` once the provider's quota and concurrency allow it."""
+    if estimated_tokens is None:
+        estimated_tokens = estimate_llm_tokens(llm_input)
+    async with llm_slot(provider, estimated_tokens):
+        on_started = llm_call_started.get()
+        if on_started is not None:
+            on_started()
+        return await runnable.ainvoke(llm_input)
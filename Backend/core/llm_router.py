@@ -0,0 +1,296 @@
+"""
+LLM Router
+Routes summarization and chat calls between Gemini and Groq, hedging to the
+other provider when the primary runs past its p95 latency and failing over
+on rate-limit, server and connection errors.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from core.llm_clients import get_llm, ainvoke_llm, llm_call_started
+from core.llm_scheduler import llm_scheduler
+from config import (
+    LLM_ROUTING_ENABLED,
+    LLM_HEDGE_QUANTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_LATENCY_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+LLM_FALLBACK_PROVIDER = {"gemini": "groq", "groq": "gemini"}
+
+# Upper bounds in seconds: 0.1s growing by 1.5x up to roughly 220s.
+LATENCY_BUCKETS = [round(0.1 * 1.5 ** i, 3) for i in range(20)]
+
+_FAILOVER_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "TimeoutError",
+    "ConnectError",
+    "ReadTimeout",
+}
+
+
+def _error_chain(error: Optional[BaseException]):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return any(
+        type(e).__name__ in ("RateLimitError", "ResourceExhausted") or _status_code(e) == 429
+        for e in _error_chain(error)
+    )
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    True for errors the other provider might not share: rate limits, 5xx,
+    timeouts and connection failures. LangChain wraps provider SDK errors, so
+    the cause chain is checked too.
+    """
+    for e in _error_chain(error):
+        if type(e).__name__ in _FAILOVER_ERROR_NAMES:
+            return True
+        status = _status_code(e)
+        if status is not None and (status == 429 or 500 <= status < 600):
+            return True
+    return False
+
+
+class LatencyHistogram:
+    """Bucketed latencies over a sliding window of the most recent samples."""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self._counts[self._samples[0]] -= 1
+            self._samples.append(bucket)
+            self._counts[bucket] += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile, or None if empty."""
+        with self._lock:
+            total = len(self._samples)
+            if total == 0:
+                return None
+            target = q * total
+            cumulative = 0
+            for bucket, count in enumerate(self._counts):
+                cumulative += count
+                if cumulative >= target:
+                    break
+        if bucket >= len(LATENCY_BUCKETS):
+            return LATENCY_BUCKETS[-1]
+        return LATENCY_BUCKETS[bucket]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class LLMRouter:
+    """
+    Runs a call on the primary provider and, if it has not finished by the
+    hedge deadline (counted from when it got a provider slot, not from when
+    it was queued), starts the same call on the secondary and keeps whichever
+    succeeds first. Deadlines come from the primary's latency histogram for
+    the same operation, since a chat answer and a full summary differ by an
+    order of magnitude.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+        self._errors: Dict[str, int] = {}
+
+    def _histogram(self, operation: str, provider: str) -> LatencyHistogram:
+        key = (operation, provider)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram()
+            return self._histograms[key]
+
+    def hedge_delay(self, operation: str, provider: str) -> float:
+        histogram = self._histogram(operation, provider)
+        if len(histogram) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, histogram.quantile(LLM_HEDGE_QUANTILE))
+
+    async def _timed(
+        self,
+        operation: str,
+        provider: str,
+        call: Callable[[str], Awaitable[Any]],
+        in_flight: Optional[asyncio.Event] = None,
+    ):
+        """
+        Run one attempt, timing it from the moment ainvoke_llm holds a
+        provider slot (queue time is local, not provider latency). Sets
+        in_flight at that moment.
+        """
+        start: Optional[float] = None
+
+        def started():
+            nonlocal start
+            if start is None:
+                start = time.perf_counter()
+                if in_flight is not None:
+                    in_flight.set()
+
+        token = llm_call_started.set(started)
+        try:
+            result = await call(provider)
+        except asyncio.CancelledError:
+            # A cancelled hedge loser was at least this slow; dropping it
+            # would bias the histogram towards fast samples. One cancelled
+            # while still queued says nothing about the provider.
+            if start is not None:
+                self._histogram(operation, provider).observe(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            self._errors[provider] = self._errors.get(provider, 0) + 1
+            if is_rate_limit_error(e):
+                llm_scheduler.throttle(provider)
+            raise
+        finally:
+            llm_call_started.reset(token)
+        if start is not None:
+            self._histogram(operation, provider).observe(time.perf_counter() - start)
+        return result
+
+    async def route(
+        self,
+        operation: str,
+        call: Callable[[str], Awaitable[Any]],
+        primary: str = "gemini",
+    ) -> Tuple[Any, str]:
+        """
+        Run ``call(provider)`` with hedging and failover.
+
+        Args:
+            operation: Name the latency histogram is kept under (e.g. "chat")
+            call: Coroutine factory taking the provider to use
+            primary: Provider tried first
+
+        Returns:
+            Tuple of (result, provider that produced it)
+        """
+        primary = primary.lower()
+        secondary = LLM_FALLBACK_PROVIDER.get(primary)
+        self._counters["calls"] += 1
+        if not LLM_ROUTING_ENABLED or secondary is None:
+            return await self._timed(operation, primary, call), primary
+
+        in_flight = asyncio.Event()
+        primary_task = asyncio.create_task(self._timed(operation, primary, call, in_flight))
+        tasks = {primary_task: primary}
+        in_flight_wait = asyncio.create_task(in_flight.wait())
+        try:
+            # The hedge deadline runs from when the primary is actually sent;
+            # hedging a call still queued locally would only add congestion.
+            await asyncio.wait({primary_task, in_flight_wait}, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_delay(operation, primary))
+            if done:
+                error = primary_task.exception()
+                if error is None:
+                    return primary_task.result(), primary
+                if not is_failover_error(error):
+                    raise error
+                self._counters["failovers"] += 1
+                logger.warning(f"{operation}: {primary} failed ({type(error).__name__}), failing over to {secondary}")
+                return await self._timed(operation, secondary, call), secondary
+
+            self._counters["hedged"] += 1
+            logger.info(f"{operation}: {primary} past hedge deadline, hedging to {secondary}")
+            tasks[asyncio.create_task(self._timed(operation, secondary, call))] = secondary
+
+            pending = set(tasks)
+            last_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if tasks[task] == secondary:
+                            self._counters["hedge_wins"] += 1
+                        return task.result(), tasks[task]
+                    last_error = error
+            raise last_error
+        finally:
+            in_flight_wait.cancel()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {
+            "enabled": LLM_ROUTING_ENABLED,
+            **self._counters,
+            "errors": dict(self._errors),
+            "latency": {
+                f"{operation}:{provider}": {
+                    **histogram.snapshot(),
+                    "hedge_delay": self.hedge_delay(operation, provider),
+                }
+                for (operation, provider), histogram in histograms.items()
+            },
+        }
+
+
+llm_router = LLMRouter()
+
+
+async def routed_ainvoke(
+    operation: str,
+    llm_input: Any,
+    primary: str = "gemini",
+    structured_output: Optional[Type] = None,
+) -> Tuple[Any, str]:
+    """Invoke the shared chat model for whichever provider the router picks."""
+
+    async def call(provider: str):
+        llm = get_llm(provider)
+        if structured_output is not None:
+            llm = llm.with_structured_output(structured_output)
+        return await ainvoke_llm(llm, provider, llm_input)
+
+    return await llm_router.route(operation, call, primary)
@@ -0,0 +1,272 @@
+"""
+LLM Quota Scheduler
+Admits LLM calls against per-provider requests-per-minute and
+tokens-per-minute budgets and concurrency slots, serving interactive chat
+before summaries and round-robin across users within each priority.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from config import (
+    GEMINI_RPM,
+    GEMINI_TPM,
+    GEMINI_MAX_CONCURRENCY,
+    GROQ_RPM,
+    GROQ_TPM,
+    GROQ_MAX_CONCURRENCY,
+    LLM_CHAT_RESERVED_SLOTS,
+)
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CHAT = 0
+PRIORITY_SUMMARY = 1
+PRIORITY_NAMES = {PRIORITY_CHAT: "chat", PRIORITY_SUMMARY: "summary"}
+
+# Set by endpoints and background work; copied into every task they spawn,
+# so hedged and map-reduce calls inherit the caller's priority and user.
+llm_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_SUMMARY)
+llm_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+PROVIDER_QUOTAS = {
+    "gemini": (GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_CONCURRENCY),
+    "groq": (GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY),
+}
+
+
+class TokenBucket:
+    """Continuously refilling budget of ``per_minute`` units."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if available now)."""
+        self._refill()
+        # A single request larger than the whole budget is let through once
+        # the bucket is full instead of waiting forever.
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket after the provider reported a rate limit."""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+@dataclass
+class _Waiter:
+    cost: int
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class ProviderScheduler:
+    """
+    One dispatcher per provider. Waiters are queued by priority, then by
+    user; the head of the highest non-empty priority is admitted as soon as
+    both buckets can cover it and a concurrency slot is free, and the user it
+    belonged to moves to the back so that one user's batch cannot starve
+    everyone else's requests. Admission holds a slot until release().
+
+    Summaries may only fill max_concurrency - reserved_chat_slots slots, so a
+    chat call finds a free slot even while summaries saturate the provider.
+    """
+
+    def __init__(self, provider: str, rpm: int, tpm: int, max_concurrency: int, reserved_chat_slots: int = 0):
+        self.provider = provider
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_chat_slots = min(max(0, reserved_chat_slots), self.max_concurrency - 1)
+        self.in_flight = 0
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"admitted": 0, "throttled": 0, "wait_seconds": 0.0}
+
+    def _ensure_dispatcher(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+
+    def _head(self) -> Optional[Tuple[int, str, _Waiter]]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            for user in list(users):
+                queue = users[user]
+                while queue and queue[0].future.done():
+                    queue.popleft()
+                if not queue:
+                    del users[user]
+                    continue
+                return priority, user, queue[0]
+        return None
+
+    def _slot_limit(self, priority: int) -> int:
+        if priority == PRIORITY_CHAT:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_chat_slots
+
+    def _admit(self, priority: int, user: str, waiter: _Waiter):
+        users = self._queues[priority]
+        users[user].popleft()
+        if users[user]:
+            users.move_to_end(user)
+        else:
+            del users[user]
+        self.requests.take(1)
+        self.tokens.take(waiter.cost)
+        self.in_flight += 1
+        self._stats["admitted"] += 1
+        self._stats["wait_seconds"] += time.monotonic() - waiter.enqueued_at
+        waiter.future.set_result(None)
+
+    async def _dispatch(self):
+        while True:
+            head = self._head()
+            if head is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            priority, user, waiter = head
+            if self.in_flight >= self._slot_limit(priority):
+                # release() or newly queued chat work wakes us up.
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(waiter.cost))
+            if wait <= 0:
+                self._admit(priority, user, waiter)
+                continue
+            # Sleep until the budget refills, but re-pick if higher-priority
+            # work arrives meanwhile.
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire(self, cost: int, priority: int, user: Optional[str]):
+        self._ensure_dispatcher()
+        waiter = _Waiter(
+            cost=cost,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic(),
+        )
+        users = self._queues.setdefault(priority, OrderedDict())
+        users.setdefault(user or "anonymous", deque()).append(waiter)
+        self._wakeup.set()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Cancelled right as it was admitted: give the slot back.
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def throttle(self):
+        self.requests.drain()
+        self.tokens.drain()
+        self._stats["throttled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        self.requests._refill()
+        self.tokens._refill()
+        return {
+            "rpm": int(self.requests.capacity),
+            "tpm": int(self.tokens.capacity),
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "reserved_chat_slots": self.reserved_chat_slots,
+            "queued": {
+                PRIORITY_NAMES.get(priority, str(priority)): sum(
+                    sum(1 for w in queue if not w.future.done()) for queue in users.values()
+                )
+                for priority, users in self._queues.items()
+            },
+            "admitted": self._stats["admitted"],
+            "throttled": self._stats["throttled"],
+            "avg_wait_seconds": (
+                self._stats["wait_seconds"] / self._stats["admitted"]
+                if self._stats["admitted"] else 0.0
+            ),
+        }
+
+    def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._wakeup = None
+
+
+class LLMScheduler:
+    def __init__(self):
+        self._providers = {
+            provider: ProviderScheduler(provider, rpm, tpm, concurrency, LLM_CHAT_RESERVED_SLOTS)
+            for provider, (rpm, tpm, concurrency) in PROVIDER_QUOTAS.items()
+        }
+
+    async def acquire(self, provider: str, estimated_tokens: int):
+        """
+        Wait until the provider's quota admits a call of estimated_tokens and
+        a concurrency slot is free, using the priority and user from the
+        current context. Every successful acquire must be paired with release().
+        """
+        await self._providers[provider.lower()].acquire(
+            estimated_tokens, llm_priority.get(), llm_user.get()
+        )
+
+    def release(self, provider: str):
+        """Free the concurrency slot taken by acquire()."""
+        self._providers[provider.lower()].release()
+
+    def throttle(self, provider: str):
+        """Back off after a 429: the provider's budget is emptied and refills from zero."""
+        scheduler = self._providers.get(provider.lower())
+        if scheduler is not None:
+            logger.warning(f"{provider} rate limit hit, draining its quota buckets")
+            scheduler.throttle()
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider: scheduler.stats() for provider, scheduler in self._providers.items()}
+
+    def shutdown(self):
+        for scheduler in self._providers.values():
+            scheduler.shutdown()
+
+
+llm_scheduler = LLMScheduler()
+
+
+def set_llm_request_context(priority: int, user_id: Optional[str] = None):
+    llm_priority.set(priority)
+    llm_user.set(user_id)
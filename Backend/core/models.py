@@ -3,13 +3,17 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import List, Literal, Annotated, Any, Dict, Optional
 from datetime import datetime
 
-class SummaryResponse(BaseModel):
+# What the LLM generates; fields that can be derived from the transcription are filled in locally.
+class SummaryLLMOutput(BaseModel):
     summary: Annotated[str, Field(..., description="Write the Concise call summary From the Transcript")]
-    duration_minutes: Annotated[int, Field(..., description="Calculate the Call duration in minutes")]
     no_of_participants: Annotated[int, Field(..., description="Count the number of participants")]
     key_aspects: Annotated[List[str], Field(..., description="List the key discussion points as bullet points")]
     sentiment: Annotated[Literal["Positive", "Negative", "Neutral"], Field(..., description="Mention the sentiment of the call")]
 
+class SummaryResponse(SummaryLLMOutput):
+    duration_minutes: Annotated[int, Field(..., description="Call duration in minutes, from the audio")]
+    language: Optional[str] = Field(default=None, description="Language detected by Whisper")
+
 
 class APIResponse(BaseModel):
     status: Annotated[str, Field(..., description="What is the Status od the Model")]
@@ -58,6 +62,9 @@ class AudioFileMetadata(BaseModel):
     storage_path: str
     file_size: int
     duration: Optional[float] = None
+    processing_status: Optional[Literal["queued", "processing", "completed", "failed"]] = None
+    processing_stages: Optional[Dict[str, str]] = None
+    processing_error: Optional[str] = None
     created_at: Optional[datetime] = None
 
 class AudioFileUploadResponse(BaseModel):
@@ -66,6 +73,25 @@ class AudioFileUploadResponse(BaseModel):
     storage_url: str
     message: str
 
+class StoredTranscriptResponse(BaseModel):
+    file_id: str
+    text: str
+    language: Optional[str] = None
+    duration: Optional[float] = None
+    segments: List[Dict[str, Any]] = []
+    model_version: str
+    stale: bool = Field(..., description="Produced by a different Whisper model than the current one")
+    updated_at: Optional[datetime] = None
+
+class StoredSummaryResponse(BaseModel):
+    file_id: str
+    summary: SummaryResponse
+    model_version: str
+    prompt_version: str
+    provider: Optional[str] = Field(default=None, description="LLM provider that generated the summary")
+    stale: bool = Field(..., description="Produced by a different model or prompt version than the current one")
+    updated_at: Optional[datetime] = None
+
 
 # Chat History Models
 class ChatMessage(BaseModel):
@@ -99,6 +125,7 @@ class ChatQueryRequest(BaseModel):
     question: str = Field(..., description="User's question about calls")
     chat_history: Optional[List[ChatMessage]] = Field(default=None, description="Optional conversation history")
     model_choice: Optional[Literal["gemini", "groq"]] = Field(default="gemini", description="LLM model to use")
+    audio_file_ids: Optional[List[str]] = Field(default=None, description="Optional audio file IDs to restrict retrieval to")
 
 class SourceDocument(BaseModel):
     content: str = Field(..., description="Content of the source document")
@@ -109,3 +136,25 @@ class ChatQueryResponse(BaseModel):
     sources: List[SourceDocument] = Field(default=[], description="Source documents used for the answer")
     model_used: str = Field(..., description="Model used to generate the response")
 
+
+
+# Summarization Job Models
+class JobStageStatus(BaseModel):
+    status: Literal["pending", "running", "completed", "failed"]
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobSubmitResponse(BaseModel):
+    job_id: str = Field(..., description="ID to poll the job with")
+    status: str = Field(..., description="Current job status")
+    status_url: str = Field(..., description="Endpoint reporting per-stage progress")
+    result_url: str = Field(..., description="Endpoint returning the summary once completed")
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stages: Dict[str, JobStageStatus]
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,265 @@
+"""
+Stored File Pipeline
+Serves persisted transcripts and summaries for uploaded audio files and only
+reruns Whisper or the LLM when the stored result was produced by a different
+model or prompt version. Also runs the full pipeline in the background for
+files uploaded with processing enabled.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.models import SummaryResponse
+from core.summarizer import summarize_transcript_served, SUMMARY_PROMPT_FINGERPRINT
+from core.llm_clients import routed_model_key
+from core.llm_scheduler import set_llm_request_context, PRIORITY_SUMMARY
+from utils.audio import submit_transcription
+from utils.db_helpers import download_user_file, get_file_transcript, get_file_summary
+from utils.supabase_client import upsert_record, service_upsert_record, service_update_record
+from utils.vector_store import ingest_transcription
+from config import WHISPER_MODEL_SIZE, PIPELINE_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_MODEL_VERSION = f"faster-whisper/{WHISPER_MODEL_SIZE}"
+# Every model and temperature the router may answer with, as in the LLM cache
+# key; a summary is also stale once the transcript it was built from would change.
+SUMMARY_MODEL_VERSION = f"{routed_model_key()}+{TRANSCRIPT_MODEL_VERSION}"
+
+# Stage hooks for get_or_create_*, so callers such as the batch pipeline can
+# apply their own concurrency limits while sharing the stored-result logic.
+# A Transcriber receives a loader for the audio bytes and is only called when
+# no fresh transcript is stored.
+Transcriber = Callable[[Callable[[], Awaitable[bytes]]], Awaitable[Dict[str, Any]]]
+# A Summarizer returns the summary and the provider that generated it.
+Summarizer = Callable[[Dict[str, Any]], Awaitable[Tuple[SummaryResponse, Optional[str]]]]
+
+
+def is_transcript_fresh(row: Optional[Dict[str, Any]]) -> bool:
+    return row is not None and row.get("model_version") == TRANSCRIPT_MODEL_VERSION
+
+
+def is_summary_fresh(row: Optional[Dict[str, Any]]) -> bool:
+    return (
+        row is not None
+        and row.get("model_version") == SUMMARY_MODEL_VERSION
+        # model_version and the fingerprint match the LLM cache key, so a
+        # stored summary is stale exactly when the cache would recompute it.
+        and row.get("prompt_version") == SUMMARY_PROMPT_FINGERPRINT
+    )
+
+
+def _transcription_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "text": row["text"],
+        "language": row.get("language"),
+        "duration": row.get("duration"),
+        "segments": row.get("segments") or [],
+    }
+
+
+async def _upsert_file_row(
+    table: str,
+    data: Dict[str, Any],
+    access_token: Optional[str],
+    service: bool,
+):
+    """Write under the user's RLS token, or with the service role only when asked to."""
+    if service:
+        await service_upsert_record(table=table, data=data, on_conflict="audio_file_id")
+        return
+    if access_token is None:
+        raise ValueError(f"access_token is required to write {table} (pass service=True for background work)")
+    await upsert_record(table=table, data=data, access_token=access_token, on_conflict="audio_file_id")
+
+
+async def save_transcription(
+    file_id: str,
+    user_id: str,
+    transcription: Dict[str, Any],
+    access_token: Optional[str] = None,
+    service: bool = False,
+):
+    await _upsert_file_row(
+        table="transcripts",
+        data={
+            "audio_file_id": file_id,
+            "user_id": user_id,
+            "text": transcription["text"],
+            "language": transcription.get("language"),
+            "duration": transcription.get("duration"),
+            "segments": transcription.get("segments"),
+            "model_version": TRANSCRIPT_MODEL_VERSION,
+        },
+        access_token=access_token,
+        service=service,
+    )
+
+
+async def save_summary(
+    file_id: str,
+    user_id: str,
+    summary: SummaryResponse,
+    provider: Optional[str],
+    access_token: Optional[str] = None,
+    service: bool = False,
+):
+    await _upsert_file_row(
+        table="summaries",
+        data={
+            "audio_file_id": file_id,
+            "user_id": user_id,
+            "content": summary.model_dump(),
+            "model_version": SUMMARY_MODEL_VERSION,
+            "prompt_version": SUMMARY_PROMPT_FINGERPRINT,
+            "provider": provider,
+        },
+        access_token=access_token,
+        service=service,
+    )
+
+
+async def _transcribe_loaded(load: Callable[[], Awaitable[bytes]]) -> Dict[str, Any]:
+    return await asyncio.wrap_future(submit_transcription(await load()))
+
+
+async def get_or_create_transcription(
+    file_id: str,
+    user_id: str,
+    access_token: str,
+    transcribe: Optional[Transcriber] = None,
+) -> Dict[str, Any]:
+    """
+    Return the transcription of a stored audio file, transcribing and
+    persisting it only if no fresh transcript is stored yet.
+    """
+    row = await get_file_transcript(file_id, user_id)
+    if is_transcript_fresh(row):
+        return _transcription_from_row(row)
+
+    async def load() -> bytes:
+        _, audio_bytes = await download_user_file(file_id, user_id)
+        return audio_bytes
+
+    transcription = await (transcribe or _transcribe_loaded)(load)
+    try:
+        await save_transcription(file_id, user_id, transcription, access_token)
+    except Exception as e:
+        logger.error(f"Failed to persist transcript for {file_id}: {str(e)}")
+    return transcription
+
+
+async def get_or_create_summary(
+    file_id: str,
+    user_id: str,
+    access_token: str,
+    transcribe: Optional[Transcriber] = None,
+    summarize: Optional[Summarizer] = None,
+) -> SummaryResponse:
+    """
+    Return the summary of a stored audio file, recomputing and persisting it
+    only if the stored one is missing or stale.
+    """
+    row = await get_file_summary(file_id, user_id)
+    if is_summary_fresh(row):
+        return SummaryResponse(**row["content"])
+
+    transcription = await get_or_create_transcription(file_id, user_id, access_token, transcribe)
+    set_llm_request_context(PRIORITY_SUMMARY, user_id)
+    summary, provider = await (summarize or summarize_transcript_served)(transcription)
+    try:
+        await save_summary(file_id, user_id, summary, provider, access_token)
+    except Exception as e:
+        logger.error(f"Failed to persist summary for {file_id}: {str(e)}")
+    return summary
+
+
+# ---------------- BACKGROUND PROCESSING ---------------- #
+
+PIPELINE_STAGES = ("transcription", "summarization", "indexing")
+
+_background_tasks: Set[asyncio.Task] = set()
+_pipeline_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_pipeline_semaphore() -> asyncio.Semaphore:
+    global _pipeline_semaphore
+    if _pipeline_semaphore is None:
+        _pipeline_semaphore = asyncio.Semaphore(PIPELINE_MAX_CONCURRENCY)
+    return _pipeline_semaphore
+
+
+async def _record_progress(
+    file_id: str,
+    status: str,
+    stages: Dict[str, str],
+    error: Optional[str] = None,
+):
+    # Written with the service client: the uploader's token may have expired
+    # by the time a long call finishes processing.
+    try:
+        await service_update_record(
+            table="audio_files",
+            record_id=file_id,
+            data={
+                "processing_status": status,
+                "processing_stages": stages,
+                "processing_error": error,
+            },
+        )
+    except Exception as e:
+        logger.error(f"Failed to record processing status for {file_id}: {str(e)}")
+
+
+async def process_uploaded_file(file_id: str, user_id: str, audio_bytes: bytes):
+    """
+    Transcribe, summarize, chunk, embed and index a freshly uploaded file,
+    recording per-stage progress on its audio_files row.
+    """
+    stages = {stage: "pending" for stage in PIPELINE_STAGES}
+    current = None
+    set_llm_request_context(PRIORITY_SUMMARY, user_id)
+    try:
+        async with _get_pipeline_semaphore():
+            current = "transcription"
+            stages[current] = "running"
+            await _record_progress(file_id, "processing", stages)
+            transcription = await asyncio.wrap_future(submit_transcription(audio_bytes))
+            await save_transcription(file_id, user_id, transcription, service=True)
+            stages[current] = "completed"
+
+            current = "summarization"
+            stages[current] = "running"
+            await _record_progress(file_id, "processing", stages)
+            summary, provider = await summarize_transcript_served(transcription)
+            await save_summary(file_id, user_id, summary, provider, service=True)
+            stages[current] = "completed"
+
+            current = "indexing"
+            stages[current] = "running"
+            await _record_progress(file_id, "processing", stages)
+            if transcription["text"].strip():
+                await run_in_threadpool(ingest_transcription, transcription, user_id, file_id)
+            stages[current] = "completed"
+
+        await _record_progress(file_id, "completed", stages)
+    except Exception as e:
+        logger.error(f"Background processing of {file_id} failed at {current}: {str(e)}")
+        if current:
+            stages[current] = "failed"
+        await _record_progress(file_id, "failed", stages, str(e))
+
+
+def schedule_file_processing(file_id: str, user_id: str, audio_bytes: bytes):
+    """Queue process_uploaded_file on the running event loop without awaiting it."""
+    task = asyncio.create_task(process_uploaded_file(file_id, user_id, audio_bytes))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def shutdown_background_processing():
+    for task in list(_background_tasks):
+        task.cancel()
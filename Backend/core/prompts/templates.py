@@ -3,6 +3,9 @@ You are an expert call transcript analyst with deep expertise in conversation an
 
 ## TRANSCRIPT TO ANALYZE
 {transcript}
+
+## FACTS ABOUT THE TRANSCRIPT
+- Total words: {word_count}
  
 ## ANALYSIS APPROACH - THINK STEP BY STEP
 
@@ -23,16 +26,6 @@ First, read through the entire transcript carefully to understand:
 - If speakers aren't explicitly labeled, identify them by: speech patterns, role in conversation, topics they address
 - Be precise: count each unique person only once, exclude automated messages
 
-**Duration Estimation:**
-- Count the total words in the transcript
-- Apply the formula: total_words ÷ 135 = approximate_minutes (average conversational pace)
-- Adjust based on context:
-  * Formal/business calls: might be slower (~125 words/min)
-  * Casual conversations: might be faster (~150 words/min)
-  * Technical discussions with pauses: slower
-- Check for any explicit time references mentioned in the transcript
-- Round to the nearest whole minute.
-
 ### STEP 3: CONTENT EXTRACTION AND ANALYSIS
 
 **Identify Critical Information:**
@@ -110,7 +103,7 @@ NEGATIVE if:
 Now craft the summary using all your analysis above:
 
 **Determine Summary Length:**
-- Count transcript words first
+- Use the total word count given above
 - Apply this scale:
   * 0-200 words → 50-100 word summary (roughly 50% compression)
   * 201-500 words → 100-200 word summary (roughly 40% compression)
@@ -138,7 +131,6 @@ Your summary should flow naturally and include:
 
 Before finalizing, verify your analysis:
 - [ ] Does my participant count make logical sense based on speaker patterns?
-- [ ] Is my duration reasonable for this word count?
 - [ ] Are my key aspects truly the MOST important points, not just the first things mentioned?
 - [ ] Does my sentiment align with the overall tone and outcome of the conversation?
 - [ ] Is my summary the right length for the transcript size?
@@ -159,7 +151,6 @@ Before finalizing, verify your analysis:
 
 6. **FORMAT COMPLIANCE**: Your final output MUST match this exact structure:
    - summary: string (the comprehensive summary you crafted)
-   - duration_minutes: integer (calculated duration)
    - no_of_participants: integer (accurate count of unique speakers)
    - key_aspects: list of strings (3-7 specific discussion points)
    - sentiment: string (exactly one of: "Positive", "Negative", "Neutral")
@@ -168,7 +159,6 @@ Before finalizing, verify your analysis:
 
 Now, based on all your careful analysis above, provide your structured response with:
 - A well-crafted summary that captures the essence of the call
-- Accurate duration based on word count and conversational context
 - Precise participant count based on speaker identification
 - 3-7 specific, actionable key discussion points prioritized by importance
 - Overall sentiment classification with clear reasoning from the transcript
@@ -177,6 +167,55 @@ Think deeply, analyze thoroughly, and deliver accurate insights.
 """
 
 
+# Appended to system_prompt / REDUCE_SUMMARY_PROMPT when the summary is streamed
+# as raw JSON instead of requested through structured output.
+JSON_OUTPUT_PROMPT = """
+
+## OUTPUT FORMAT
+Respond with only the JSON object, no other text, and write the fields in this order: summary, no_of_participants, key_aspects, sentiment.
+{format_instructions}
+"""
+
+
+# Map step of long-transcript summarization: one call per transcript chunk.
+CHUNK_SUMMARY_PROMPT = """
+You are analyzing part {part} of {total} of a call transcript. Write concise notes on this part only.
+
+Capture, as short bullet points:
+- Who is speaking and in what role (agent, customer, friend, etc.), and any new participants
+- Issues raised, information exchanged and decisions made
+- Commitments, action items and owners
+- Concrete details: names, numbers, dates, products, policies
+- The emotional tone and how it changes (frustration, appreciation, escalation)
+- Anything left unresolved at the end of this part
+
+Only include what is stated or clearly implied. Do not summarize other parts.
+
+## TRANSCRIPT PART {part} OF {total}
+{transcript}
+"""
+
+
+# Reduce step of long-transcript summarization: merges the chunk notes.
+REDUCE_SUMMARY_PROMPT = """
+You are an expert call transcript analyst. A long call transcript was split into {total} consecutive parts and each part was condensed into notes. Combine the notes into one analysis of the whole call.
+
+## NOTES (in call order)
+{notes}
+
+## FACTS ABOUT THE FULL TRANSCRIPT
+- Total words: {word_count}
+
+## INSTRUCTIONS
+- summary: a coherent summary of the whole call in past tense covering context, core content, resolution and outstanding items. Aim for 500-800 words.
+- no_of_participants: count each distinct person once across all parts; the same role in different parts is usually the same person. Exclude automated messages.
+- key_aspects: the 3-7 most important points of the whole call, specific and actionable, prioritized: main issue → resolution → commitments → critical details → follow-ups.
+- sentiment: exactly one of "Positive", "Negative", "Neutral", weighing how the call ended most heavily.
+
+Only use information present in the notes. Do not invent details.
+"""
+
+
 CHATBOT_PROMPT = """You are an AI assistant specialized in analyzing call summaries and transcripts. 
 Your role is to help users understand their call data by answering questions based on the provided context.
 
@@ -1,43 +1,184 @@
+import asyncio
 import warnings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from utils.audio import transcribe_audio_simple
-from core.prompts.templates import system_prompt
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from langchain_core.output_parsers import JsonOutputParser
+from utils.audio import submit_transcription
+from utils.text_processing import count_tokens, split_extracted_text
+from utils.transcript_compaction import compact_transcript, truncate_to_tokens, COMPACTION_VERSION
+from core.prompts.templates import system_prompt, CHUNK_SUMMARY_PROMPT, REDUCE_SUMMARY_PROMPT, JSON_OUTPUT_PROMPT
 from config import (
-    GEMINI_API_KEY,
-    GEMINI_MODEL_NAME,
-    GEMINI_TEMPERATURE,
-    GROQ_API_KEY,
-    GROQ_MODEL_NAME,
-    GROQ_TEMPERATURE
+    SUMMARY_MAP_REDUCE_TOKEN_THRESHOLD,
+    SUMMARY_MAP_CHUNK_TOKENS,
+    SUMMARY_MAP_CHUNK_OVERLAP_TOKENS,
+    SUMMARY_MAP_CONCURRENCY,
+    TRANSCRIPT_COMPACTION_ENABLED,
+    SUMMARY_CALL_TOKEN_BUDGET
 )
-from core.models import SummaryResponse
+from core.models import SummaryResponse, SummaryLLMOutput
+from core.llm_cache import cached_llm_call, prompt_fingerprint
+from core.llm_clients import get_llm, llm_slot, estimate_llm_tokens, routed_model_key
+from core.llm_router import routed_ainvoke
 
 warnings.filterwarnings("ignore")
 
+PartialCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Only used when a bare transcript arrives without Whisper's audio duration.
+WORDS_PER_MINUTE = 135
+
+SUMMARY_PROMPT_FINGERPRINT = prompt_fingerprint(
+    system_prompt,
+    CHUNK_SUMMARY_PROMPT,
+    REDUCE_SUMMARY_PROMPT,
+    str(SUMMARY_MAP_REDUCE_TOKEN_THRESHOLD),
+    f"compaction={COMPACTION_VERSION if TRANSCRIPT_COMPACTION_ENABLED else 'off'}",
+    str(SUMMARY_CALL_TOKEN_BUDGET)
+)
+
 def create_gemini_llm():
-    """Create and return a Google Gemini LLM instance."""
-    return ChatGoogleGenerativeAI(
-        model=GEMINI_MODEL_NAME,
-        api_key=GEMINI_API_KEY,
-        temperature=GEMINI_TEMPERATURE
-    )
+    """Return the shared Google Gemini LLM instance."""
+    return get_llm("gemini")
 
 def create_groq_llm():
-    """Create and return a Groq LLM instance."""
-    return ChatGroq(
-        model=GROQ_MODEL_NAME,
-        api_key=GROQ_API_KEY,
-        temperature=GROQ_TEMPERATURE
+    """Return the shared Groq LLM instance."""
+    return get_llm("groq")
+
+def call_duration_minutes(duration_seconds: float | None, word_count: int) -> int:
+    """Call length in whole minutes from the audio duration, else from the word count."""
+    minutes = duration_seconds / 60 if duration_seconds else word_count / WORDS_PER_MINUTE
+    return max(1, round(minutes)) if minutes > 0 else 0
+
+async def _astream_summary(prompt: str, on_partial: PartialCallback) -> SummaryLLMOutput:
+    """
+    Generate the summary as streamed JSON on Gemini, awaiting on_partial with
+    every new partial parse. Not hedged: a stream cannot switch providers once
+    the client has seen part of it.
+    """
+    parser = JsonOutputParser(pydantic_object=SummaryLLMOutput)
+    chain = create_gemini_llm() | parser
+    final_prompt = prompt + JSON_OUTPUT_PROMPT.format(
+        format_instructions=parser.get_format_instructions()
     )
+    latest: Dict[str, Any] = {}
+    async with llm_slot("gemini", estimate_llm_tokens(final_prompt)):
+        async for partial in chain.astream(final_prompt):
+            if partial and partial != latest:
+                latest = partial
+                await on_partial(partial)
+    return SummaryLLMOutput(**latest)
 
-def generate_summary(audio_file_path: str | None = None) -> dict:
-    if audio_file_path is None:
-        raise ValueError("Provide the valid Audio File for processing")
-    transcript = transcribe_audio_simple(audio_file_path)
-    llm = create_gemini_llm()
-    st_llm = llm.with_structured_output(SummaryResponse)
-    final_prompt = system_prompt.format(transcript=transcript)
-    response = st_llm.invoke(final_prompt)
-    return response
+async def map_reduce_summary(
+    transcript: str,
+    word_count: int | None = None,
+    on_partial: Optional[PartialCallback] = None
+) -> Tuple[SummaryLLMOutput, str]:
+    """
+    Summarize a long transcript by condensing its chunks concurrently with a
+    light prompt, then reducing the notes into one SummaryLLMOutput. Also
+    returns the provider that wrote the final summary.
+    """
+    chunks = split_extracted_text(
+        transcript,
+        chunk_size=SUMMARY_MAP_CHUNK_TOKENS,
+        chunk_overlap=SUMMARY_MAP_CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens
+    )
+    map_prompts = [
+        CHUNK_SUMMARY_PROMPT.format(part=i + 1, total=len(chunks), transcript=chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+    # Keeps one long transcript from taking every provider slot at once.
+    map_limit = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
 
+    async def summarize_chunk(prompt: str):
+        async with map_limit:
+            note, _ = await routed_ainvoke("summary_map", prompt)
+            return note
+
+    notes = await asyncio.gather(*(summarize_chunk(prompt) for prompt in map_prompts))
+
+    notes_text = "\n\n".join(
+        f"### PART {i + 1}\n{note.content}" for i, note in enumerate(notes)
+    )
+    reduce_prompt = REDUCE_SUMMARY_PROMPT.format(
+        total=len(chunks),
+        notes=truncate_to_tokens(notes_text, SUMMARY_CALL_TOKEN_BUDGET),
+        word_count=word_count or len(transcript.split())
+    )
+    if on_partial is not None:
+        return await _astream_summary(reduce_prompt, on_partial), "gemini"
+    return await routed_ainvoke("summary_reduce", reduce_prompt, structured_output=SummaryLLMOutput)
+
+async def _summarize_uncached(
+    transcript: str,
+    word_count: int,
+    on_partial: Optional[PartialCallback] = None
+) -> Tuple[SummaryLLMOutput, str]:
+    if count_tokens(transcript) > SUMMARY_MAP_REDUCE_TOKEN_THRESHOLD:
+        return await map_reduce_summary(transcript, word_count, on_partial)
+    final_prompt = system_prompt.format(
+        transcript=truncate_to_tokens(transcript, SUMMARY_CALL_TOKEN_BUDGET),
+        word_count=word_count
+    )
+    if on_partial is not None:
+        return await _astream_summary(final_prompt, on_partial), "gemini"
+    return await routed_ainvoke("summary", final_prompt, structured_output=SummaryLLMOutput)
+
+async def summarize_transcript_served(
+    transcription: Dict[str, Any] | str,
+    on_partial: Optional[PartialCallback] = None
+) -> Tuple[SummaryResponse, Optional[str]]:
+    """
+    summarize_transcript, also returning the provider that generated the
+    summary (remembered in the cache; None for entries cached before it was).
+    """
+    if isinstance(transcription, str):
+        transcription = {"text": transcription}
+    transcript = transcription["text"]
+    # Fillers still count towards how much was said.
+    word_count = len(transcript.split())
+    if TRANSCRIPT_COMPACTION_ENABLED:
+        transcript, _ = compact_transcript(transcript)
+
+    async def compute():
+        output, provider = await _summarize_uncached(transcript, word_count, on_partial)
+        return {**output.model_dump(), "provider": provider}
+
+    # Keyed on the "summary" operation rather than a provider: the router may
+    # answer from Gemini or Groq, and either result is a valid summary.
+    result = dict(await cached_llm_call(
+        provider="summary",
+        model=routed_model_key(),
+        temperature=None,
+        fingerprint=SUMMARY_PROMPT_FINGERPRINT,
+        payload={"transcript": transcript, "word_count": word_count},
+        compute=compute
+    ))
+    provider = result.pop("provider", None)
+    summary = SummaryResponse(
+        **result,
+        duration_minutes=call_duration_minutes(transcription.get("duration"), word_count),
+        language=transcription.get("language")
+    )
+    return summary, provider
+
+async def summarize_transcript(
+    transcription: Dict[str, Any] | str,
+    on_partial: Optional[PartialCallback] = None
+) -> SummaryResponse:
+    """
+    Run the LLM stage of the pipeline on a transcription as returned by
+    submit_transcription (or on bare transcript text). duration_minutes and
+    language come from the transcription, everything else from the LLM.
+
+    With on_partial, the final call is streamed and on_partial is awaited with
+    each partially parsed LLM output dict (not called on a cache hit).
+    """
+    summary, _ = await summarize_transcript_served(transcription, on_partial)
+    return summary
+
+async def generate_summary(audio: bytes | str | None = None) -> SummaryResponse:
+    if audio is None:
+        raise ValueError("Provide the valid Audio File for processing")
+    transcription = await asyncio.wrap_future(submit_transcription(audio))
+    return await summarize_transcript(transcription)
@@ -61,6 +61,10 @@ CREATE TABLE IF NOT EXISTS audio_files (
     storage_path TEXT NOT NULL,
     file_size BIGINT NOT NULL,
     duration FLOAT,
+    -- Background pipeline progress (set when uploaded with ?process=true)
+    processing_status TEXT CHECK (processing_status IN ('queued', 'processing', 'completed', 'failed')),
+    processing_stages JSONB,
+    processing_error TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -90,6 +94,95 @@ CREATE POLICY "Users can delete their own audio files"
     USING (auth.uid() = user_id);
 
 
+-- ============================================
+-- TRANSCRIPTS TABLE
+-- ============================================
+-- One transcript per audio file. model_version records the Whisper model that
+-- produced it; the backend recomputes only when that no longer matches config.
+CREATE TABLE IF NOT EXISTS transcripts (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    audio_file_id UUID NOT NULL UNIQUE REFERENCES audio_files(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    language TEXT,
+    duration FLOAT,
+    segments JSONB,
+    model_version TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- audio_file_id is indexed by its UNIQUE constraint
+CREATE INDEX IF NOT EXISTS idx_transcripts_user_id ON transcripts(user_id);
+
+-- Enable Row Level Security
+ALTER TABLE transcripts ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policies for transcripts
+CREATE POLICY "Users can view their own transcripts"
+    ON transcripts FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own transcripts"
+    ON transcripts FOR INSERT
+    WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update their own transcripts"
+    ON transcripts FOR UPDATE
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete their own transcripts"
+    ON transcripts FOR DELETE
+    USING (auth.uid() = user_id);
+
+
+-- ============================================
+-- SUMMARIES TABLE
+-- ============================================
+-- One summary per audio file. content holds the SummaryResponse fields;
+-- model_version and prompt_version (the summarizer's prompt fingerprint,
+-- covering templates, compaction rules and token limits) decide when it has
+-- gone stale. model_version lists every model the router may answer with;
+-- provider records the one that actually did.
+CREATE TABLE IF NOT EXISTS summaries (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    audio_file_id UUID NOT NULL UNIQUE REFERENCES audio_files(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    content JSONB NOT NULL,
+    model_version TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    provider TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- For tables created before provider was recorded
+ALTER TABLE summaries ADD COLUMN IF NOT EXISTS provider TEXT;
+
+-- audio_file_id is indexed by its UNIQUE constraint
+CREATE INDEX IF NOT EXISTS idx_summaries_user_id ON summaries(user_id);
+
+-- Enable Row Level Security
+ALTER TABLE summaries ENABLE ROW LEVEL SECURITY;
+
+-- RLS Policies for summaries
+CREATE POLICY "Users can view their own summaries"
+    ON summaries FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own summaries"
+    ON summaries FOR INSERT
+    WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update their own summaries"
+    ON summaries FOR UPDATE
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete their own summaries"
+    ON summaries FOR DELETE
+    USING (auth.uid() = user_id);
+
+
 -- ============================================
 -- CHAT CONVERSATIONS TABLE
 -- ============================================
@@ -207,6 +300,18 @@ CREATE TRIGGER update_audio_files_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Trigger for transcripts
+CREATE TRIGGER update_transcripts_updated_at
+    BEFORE UPDATE ON transcripts
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Trigger for summaries
+CREATE TRIGGER update_summaries_updated_at
+    BEFORE UPDATE ON summaries
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 -- Trigger for chat_conversations
 CREATE TRIGGER update_chat_conversations_updated_at
     BEFORE UPDATE ON chat_conversations
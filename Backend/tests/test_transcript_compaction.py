@@ -0,0 +1,50 @@
+import pytest
+
+from utils.transcript_compaction import compact_transcript
+
+
+@pytest.mark.parametrize("text", [
+    "seven seven zero",
+    "7 7 0 0 3",
+    "five five five",
+    "call me on 555 555 5555",
+    "oh oh seven",
+    "one two one two one two",
+    "the total was 40 40 40 dollars",
+    "I had had enough",
+    "I think that that is fine",
+    "Go to the ER now",
+    "Ahmed said yes",
+    "Order 123. Order 123.",
+    "No. No.",
+    "Bye. Bye.",
+])
+def test_leaves_meaningful_text_alone(text):
+    compacted, stats = compact_transcript(text)
+    assert compacted == text
+    assert stats.repeats_collapsed == 0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Go to the ER, er, now", "Go to the ER, now"),
+    ("Um, I think so", "I think so"),
+    ("so uh we shipped it", "so we shipped it"),
+    ("Hmm... okay", "okay"),
+    ("I said um... hmm", "I said"),
+    ("so um\u2026 we shipped it", "so we shipped it"),
+])
+def test_removes_hesitation_fillers(text, expected):
+    assert compact_transcript(text)[0] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I I I think so", "I think so"),
+    ("the, the, the plan", "the plan"),
+    ("I'm I'm I'm sure", "I'm sure"),
+    ("Thank you. Thank you. Thank you.", "Thank you."),
+    ("We will call you back. We will call you back.", "We will call you back."),
+])
+def test_collapses_stutters_and_loops(text, expected):
+    compacted, stats = compact_transcript(text)
+    assert compacted == expected
+    assert stats.repeats_collapsed >= 1
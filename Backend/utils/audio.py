@@ -1,48 +1,374 @@
 from faster_whisper import WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from collections import Counter
+import av
+import numpy as np
+import io
 import warnings
 import os
-from config import WHISPER_MODEL_SIZE
-
-# Try to import pydub, but handle Python 3.13 compatibility issue
-try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
-except (ImportError, ModuleNotFoundError) as e:
-    PYDUB_AVAILABLE = False
-    import logging
-    logging.warning(f"pydub not available (Python 3.13+ compatibility issue): {e}")
+import threading
+import multiprocessing
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List
+from config import (
+    WHISPER_MODEL_SIZE,
+    WHISPER_POOL_SIZE,
+    WHISPER_CPU_THREADS,
+    LONG_AUDIO_MIN_SECONDS,
+    LONG_AUDIO_REGION_SECONDS,
+    VAD_MIN_SILENCE_MS,
+    VAD_SPEECH_PAD_MS,
+    VAD_MAX_REGION_GAP_MS,
+    STREAM_REGION_SECONDS
+)
+from utils.transcript_cache import transcript_cache, make_cache_key
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
+WHISPER_MODEL_SIZES = ["tiny", "base", "small", "medium", "large"]
+WHISPER_SAMPLING_RATE = 16000
+
+# Per-process model cache. Inside a pool worker it holds the model loaded by
+# the initializer, so every task served by that worker reuses it.
 _MODEL_CACHE = {}
 
-def get_whisper_model(model_size):
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+# Threads that hash uploads, look them up in the transcript cache and probe
+# their length. They never wait on decoding or transcription themselves.
+_DISPATCHER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="convox-dispatch")
+# Threads that decode long calls, run VAD and fan regions out to the pool.
+# Kept apart so a few hour-long uploads cannot delay cache hits behind them.
+_DECODER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="convox-vad")
+
+def get_whisper_model(model_size, cpu_threads=WHISPER_CPU_THREADS):
     if model_size not in _MODEL_CACHE:
-        _MODEL_CACHE[model_size] = WhisperModel(model_size, device="cpu", compute_type="int8")
+        _MODEL_CACHE[model_size] = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type="int8",
+            cpu_threads=cpu_threads
+        )
     return _MODEL_CACHE[model_size]
 
-def convert_to_wav(input_file_path, output_file_path):
-    if not PYDUB_AVAILABLE:
-        raise RuntimeError(
-            "Audio conversion requires pydub, which is not available in Python 3.13+. "
-            "Please use Python 3.11 or 3.12, or provide audio files in WAV format."
+def decode_audio_bytes(audio_bytes: bytes) -> np.ndarray:
+    """
+    Decode an encoded upload (wav, mp3, m4a, flac, ogg) straight into the
+    16 kHz mono float32 buffer Whisper expects, using PyAV in memory.
+    """
+    try:
+        return decode_audio(io.BytesIO(audio_bytes), sampling_rate=WHISPER_SAMPLING_RATE)
+    except Exception as e:
+        raise ValueError(f"Audio decoding failed: {e}")
+
+def _decode(audio: bytes | str) -> np.ndarray:
+    if isinstance(audio, (bytes, bytearray)):
+        return decode_audio_bytes(audio)
+    return decode_audio(audio, sampling_rate=WHISPER_SAMPLING_RATE)
+
+def probe_duration(audio: bytes | str) -> float | None:
+    """Read the duration in seconds from the container header without decoding."""
+    source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    try:
+        with av.open(source) as container:
+            if container.duration is not None:
+                return container.duration / av.time_base
+            stream = container.streams.audio[0]
+            if stream.duration is not None and stream.time_base is not None:
+                return float(stream.duration * stream.time_base)
+    except Exception:
+        pass
+    return None
+
+def _build_result(segments: List[Dict[str, Any]], language: str | None, duration: float) -> Dict[str, Any]:
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "language": language,
+        "duration": duration,
+        "segments": segments
+    }
+
+# ---------------- TRANSCRIPTION WORKERS ---------------- #
+
+def _init_worker(model_size, cpu_threads):
+    """Load the Whisper model once when a pool worker starts."""
+    get_whisper_model(model_size, cpu_threads)
+
+def _warmup_worker():
+    return os.getpid()
+
+def _transcribe_in_worker(audio, model_size):
+    # Raw bytes are decoded here rather than in the API process so decoding
+    # is spread across the pool too. Paths are decoded by faster-whisper itself.
+    if isinstance(audio, (bytes, bytearray)):
+        audio = decode_audio_bytes(audio)
+    model = get_whisper_model(model_size)
+    segments, info = model.transcribe(audio)
+    return _build_result(
+        [{"start": s.start, "end": s.end, "text": s.text} for s in segments],
+        info.language,
+        info.duration
+    )
+
+def _transcribe_region_in_worker(samples: np.ndarray, offset: float, model_size, vad_filter=False):
+    """Transcribe one speech region, shifting its timestamps back onto the call timeline."""
+    model = get_whisper_model(model_size)
+    segments, info = model.transcribe(samples, vad_filter=vad_filter)
+    return {
+        "language": info.language,
+        "segments": [
+            {"start": offset + s.start, "end": offset + s.end, "text": s.text}
+            for s in segments
+        ]
+    }
+
+def get_transcription_pool() -> ProcessPoolExecutor:
+    """
+    Return the process-wide Whisper worker pool, creating it on first use.
+
+    Workers are spawned rather than forked so they never inherit the API
+    process's threads, and each one preloads WHISPER_MODEL_SIZE with
+    WHISPER_CPU_THREADS intra-op threads.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=WHISPER_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(WHISPER_MODEL_SIZE, WHISPER_CPU_THREADS)
+            )
+        return _POOL
+
+def _reset_transcription_pool(broken: ProcessPoolExecutor | None = None):
+    """Shut the pool down; with ``broken``, only if it is still the current pool."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None and (broken is None or _POOL is broken):
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+def start_transcription_pool():
+    """Spawn every worker up front so the models are loaded before the first upload."""
+    pool = get_transcription_pool()
+    for _ in range(WHISPER_POOL_SIZE):
+        pool.submit(_warmup_worker)
+
+def shutdown_transcription_pool():
+    _reset_transcription_pool()
+
+def _submit_to_pool(func, *args) -> Future:
+    pool = get_transcription_pool()
+    try:
+        return pool.submit(func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); start over with a fresh pool. Another
+        # thread may have replaced it already, and resetting that one would
+        # cancel the work it has just been given.
+        _reset_transcription_pool(pool)
+        return get_transcription_pool().submit(func, *args)
+
+# ---------------- LONG AUDIO ---------------- #
+
+def split_speech_regions(
+    audio: np.ndarray,
+    max_region_seconds: float = LONG_AUDIO_REGION_SECONDS
+) -> List[tuple[int, int]]:
+    """
+    Find speech with Silero VAD and group it into regions of at most
+    max_region_seconds, returned as (start, end) sample offsets.
+    Silence between regions is dropped; pauses inside a region are kept so
+    timestamps within it stay linear, but a pause longer than
+    VAD_MAX_REGION_GAP_MS always starts a new region.
+    """
+    vad_options = VadOptions(
+        min_silence_duration_ms=VAD_MIN_SILENCE_MS,
+        speech_pad_ms=VAD_SPEECH_PAD_MS,
+        max_speech_duration_s=max_region_seconds
+    )
+    speech_chunks = get_speech_timestamps(audio, vad_options, sampling_rate=WHISPER_SAMPLING_RATE)
+
+    max_region = int(max_region_seconds * WHISPER_SAMPLING_RATE)
+    max_gap = VAD_MAX_REGION_GAP_MS * WHISPER_SAMPLING_RATE // 1000
+    regions = []
+    for chunk in speech_chunks:
+        if (
+            regions
+            and chunk["start"] - regions[-1][1] <= max_gap
+            and chunk["end"] - regions[-1][0] <= max_region
+        ):
+            regions[-1] = (regions[-1][0], chunk["end"])
+        else:
+            regions.append((chunk["start"], chunk["end"]))
+    return regions
+
+def _start_long_transcription(audio: bytes | str, model_size) -> Future:
+    """
+    Fan the speech regions of a long call out to the pool and return a future
+    for the stitched result, without waiting for the regions here.
+    """
+    samples = _decode(audio)
+    duration = len(samples) / WHISPER_SAMPLING_RATE
+    regions = split_speech_regions(samples)
+
+    futures = [
+        _submit_to_pool(
+            _transcribe_region_in_worker,
+            samples[start:end],
+            start / WHISPER_SAMPLING_RATE,
+            model_size
         )
+        for start, end in regions
+    ]
+    stitched = Future()
+    if not futures:
+        stitched.set_result(_build_result([], None, duration))
+        return stitched
+
+    remaining = [len(futures)]
+    remaining_lock = threading.Lock()
+
+    def _region_done(_):
+        with remaining_lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            results = [future.result() for future in futures]
+        except Exception as e:
+            _settle(stitched, exception=e)
+            return
+        segments = [segment for result in results for segment in result["segments"]]
+        languages = Counter(result["language"] for result in results if result["segments"])
+        language = languages.most_common(1)[0][0] if languages else None
+        _settle(stitched, result=_build_result(segments, language, duration))
+
+    for future in futures:
+        future.add_done_callback(_region_done)
+    stitched.add_done_callback(lambda f: f.cancelled() and [future.cancel() for future in futures])
+    return stitched
+
+# ---------------- PUBLIC API ---------------- #
+
+def transcription_cache_key(audio: bytes | str, model_size=WHISPER_MODEL_SIZE, stream: bool = False) -> str:
+    """
+    Cache key for a transcription of audio. ``stream=True`` keys the
+    WebSocket file mode, which always splits on VAD into
+    STREAM_REGION_SECONDS regions and so can decode differently from
+    submit_transcription.
+    """
+    options = dict(
+        sampling_rate=WHISPER_SAMPLING_RATE,
+        long_audio_min_seconds=LONG_AUDIO_MIN_SECONDS,
+        region_seconds=LONG_AUDIO_REGION_SECONDS,
+        vad_min_silence_ms=VAD_MIN_SILENCE_MS,
+        vad_speech_pad_ms=VAD_SPEECH_PAD_MS,
+        vad_max_region_gap_ms=VAD_MAX_REGION_GAP_MS
+    )
+    if stream:
+        options.update(mode="stream", long_audio_min_seconds=0, region_seconds=STREAM_REGION_SECONDS)
+    return make_cache_key(audio, model_size, **options)
+
+def submit_region(
+    samples: np.ndarray,
+    offset: float,
+    model_size=WHISPER_MODEL_SIZE,
+    vad_filter: bool = False
+) -> Future:
+    """
+    Queue one slice of decoded 16 kHz audio on the worker pool. The future
+    resolves to its detected ``language`` and ``segments``, with timestamps
+    shifted by ``offset`` seconds.
+    """
+    if model_size not in WHISPER_MODEL_SIZES:
+        raise ValueError("Invalid model size.")
+    return _submit_to_pool(_transcribe_region_in_worker, samples, offset, model_size, vad_filter)
+
+def _settle(future: Future, result: Any = None, exception: BaseException | None = None):
+    """Resolve future unless the caller already cancelled it."""
+    if future.done():
+        return
     try:
-        audio = AudioSegment.from_file(input_file_path)
-        audio.export(output_file_path, format="wav")
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+def _chain(source: Future, target: Future):
+    """Copy source's outcome into target; cancelling target cancels source."""
+    def _copy(done: Future):
+        if done.cancelled():
+            target.cancel()
+        elif done.exception() is not None:
+            _settle(target, exception=done.exception())
+        else:
+            _settle(target, result=done.result())
+    source.add_done_callback(_copy)
+    target.add_done_callback(lambda f: f.cancelled() and source.cancel())
+
+def _decode_long_transcription(target: Future, audio: bytes | str, model_size):
+    if target.cancelled():
+        return
+    try:
+        _chain(_start_long_transcription(audio, model_size), target)
+    except Exception as e:
+        _settle(target, exception=e)
+
+def _dispatch_transcription(target: Future, audio: bytes | str, model_size):
+    if target.cancelled():
+        return
+    try:
+        cache_key = transcription_cache_key(audio, model_size)
+        cached = transcript_cache.get(cache_key)
+        if cached is not None:
+            _settle(target, result=cached)
+            return
+
+        duration = probe_duration(audio)
+        if duration is not None and duration >= LONG_AUDIO_MIN_SECONDS:
+            source = Future()
+            _DECODER.submit(_decode_long_transcription, source, audio, model_size)
+        else:
+            source = _submit_to_pool(_transcribe_in_worker, audio, model_size)
+
+        def _store(done: Future):
+            if not done.cancelled() and done.exception() is None:
+                transcript_cache.set(cache_key, done.result())
+
+        source.add_done_callback(_store)
+        _chain(source, target)
     except Exception as e:
-        raise RuntimeError(f"Audio conversion failed: {e}")
+        _settle(target, exception=e)
+
+def submit_transcription(audio: bytes | str, model_size=WHISPER_MODEL_SIZE) -> Future:
+    """
+    Return a future resolving to the transcription of the audio, a dict with
+    the full ``text``, detected ``language``, ``duration`` in seconds and
+    timestamped ``segments``.
 
-def transcribe_audio_simple(audio_file_path, model_size=WHISPER_MODEL_SIZE):
-    if model_size not in ["tiny", "base", "small", "medium", "large"]:
+    Identical audio transcribed with the same settings is served from the
+    transcript cache. Calls longer than LONG_AUDIO_MIN_SECONDS are split on
+    silence and their speech regions transcribed in parallel across the pool;
+    everything else is a single pool task. Results are cached once complete.
+
+    Args:
+        audio: Encoded audio bytes as uploaded, or a path to an audio file
+        model_size: Whisper model size
+    """
+    if model_size not in WHISPER_MODEL_SIZES:
         raise ValueError("Invalid model size.")
-    if not audio_file_path.lower().endswith(".wav"):
-        wav_file_path = audio_file_path.rsplit(".", 1)[0] + ".wav"
-        if not os.path.exists(wav_file_path):
-            convert_to_wav(audio_file_path, wav_file_path)
-        audio_file_path = wav_file_path
-    model = get_whisper_model(model_size)
-    segments, info = model.transcribe(audio_file_path)
-    text = " ".join([segment.text for segment in segments])
-    return text
 
+    # Hashing the upload and probing its container are done on a dispatcher
+    # thread, since callers are usually on the event loop.
+    future = Future()
+    _DISPATCHER.submit(_dispatch_transcription, future, audio, model_size)
+    return future
+
+def transcribe_audio_simple(audio: bytes | str, model_size=WHISPER_MODEL_SIZE):
+    return submit_transcription(audio, model_size).result()["text"]
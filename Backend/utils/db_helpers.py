@@ -2,9 +2,10 @@
 Database helper utilities for common query patterns.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import HTTPException, status
-from utils.supabase_client import get_records
+from utils.supabase_client import get_records, download_file_from_storage
+from config import AUDIO_BUCKET_NAME
 import logging
 
 logger = logging.getLogger(__name__)
@@ -59,7 +60,7 @@ async def get_user_file(
         HTTPException: If file not found or doesn't belong to user
     """
     files = await get_records(
-        table_name="audio_files",
+        table="audio_files",
         filters={"id": file_id, "user_id": user_id}
     )
     
@@ -70,3 +71,67 @@ async def get_user_file(
         )
     
     return files[0]
+
+
+async def download_user_file(
+    file_id: str,
+    user_id: str
+) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Fetch an audio file's metadata and bytes, ensuring it belongs to the user.
+    
+    Args:
+        file_id: The file ID to download
+        user_id: The user ID who should own the file
+        
+    Returns:
+        Tuple of (file metadata dictionary, file contents)
+        
+    Raises:
+        HTTPException: If file not found or doesn't belong to user
+    """
+    meta = await get_user_file(file_id, user_id)
+    file_data = await download_file_from_storage(AUDIO_BUCKET_NAME, meta["storage_path"])
+    return meta, file_data
+
+
+async def get_file_transcript(
+    file_id: str,
+    user_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the persisted transcript of an audio file, if one exists.
+    
+    Args:
+        file_id: The audio file ID
+        user_id: The user ID who should own the file
+        
+    Returns:
+        Transcript row, or None if the file has not been transcribed
+    """
+    transcripts = await get_records(
+        table="transcripts",
+        filters={"audio_file_id": file_id, "user_id": user_id}
+    )
+    return transcripts[0] if transcripts else None
+
+
+async def get_file_summary(
+    file_id: str,
+    user_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the persisted summary of an audio file, if one exists.
+    
+    Args:
+        file_id: The audio file ID
+        user_id: The user ID who should own the file
+        
+    Returns:
+        Summary row, or None if the file has not been summarized
+    """
+    summaries = await get_records(
+        table="summaries",
+        filters={"audio_file_id": file_id, "user_id": user_id}
+    )
+    return summaries[0] if summaries else None
@@ -0,0 +1,224 @@
+"""
+Embedding Cache
+Persistent cache from a hash of a chunk's text to its embedding, so re-ingested
+calls, overlapping chunks and repeated queries skip the encoder. Vectors live
+in a float16 memory-mapped slot file; a SQLite index maps hashes to slots and
+evicts the least recently used entries once the file is full.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDINGS_DIMENSION,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+_VECTOR_DTYPE = np.float16
+
+
+def embedding_key(kind: str, text: str) -> str:
+    """Hash of the text, separated by kind so query and document vectors never mix."""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Fixed-capacity slot file plus a SQLite index. The cache is tied to a model
+    identity string; opening it with a different identity (another model, or
+    another dimension) drops every entry.
+    """
+
+    def __init__(
+        self,
+        identity: str,
+        directory: str = EMBEDDING_CACHE_DIR,
+        dimension: int = EMBEDDINGS_DIMENSION,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+    ):
+        self.identity = identity
+        self.dimension = dimension
+        self.capacity = max(1, max_bytes // (dimension * np.dtype(_VECTOR_DTYPE).itemsize))
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"), check_same_thread=False, timeout=5
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        path = os.path.join(directory, "vectors.f16")
+        expected_size = self.capacity * dimension * np.dtype(_VECTOR_DTYPE).itemsize
+        stored = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        stale = (
+            stored.get("identity") != identity
+            or stored.get("capacity") != str(self.capacity)
+            or not os.path.exists(path)
+            or os.path.getsize(path) != expected_size
+        )
+        if stale:
+            if stored:
+                logger.info(f"Embedding cache identity or size changed, clearing {directory}")
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                [("identity", identity), ("capacity", str(self.capacity))],
+            )
+            with open(path, "wb") as f:
+                f.truncate(expected_size)  # sparse until slots are written
+        self._conn.commit()
+        self._vectors = np.memmap(path, dtype=_VECTOR_DTYPE, mode="r+", shape=(self.capacity, dimension))
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors (as float32) for whichever keys are present."""
+        if not keys:
+            return {}
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, slot FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, slot in rows:
+                    found[key] = np.asarray(self._vectors[slot], dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+            self._counters["hits"] += sum(1 for key in keys if key in found)
+            self._counters["misses"] += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes cannot
+            # hand out the same slot.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Counted once per batch (COUNT(*) is a full scan) and tracked
+                # locally while the write lock is held.
+                count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                for key, vector in items.items():
+                    row = self._conn.execute("SELECT slot FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        slot = row[0]
+                    else:
+                        if count < self.capacity:
+                            # Slots are only freed by eviction, which reuses
+                            # them at once, so occupied slots stay 0..count-1.
+                            slot = count
+                            count += 1
+                        else:
+                            key_evicted, slot = self._conn.execute(
+                                "SELECT key, slot FROM embeddings ORDER BY last_used LIMIT 1"
+                            ).fetchone()
+                            self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key_evicted,))
+                            self._counters["evictions"] += 1
+                    self._vectors[slot] = np.asarray(vector, dtype=_VECTOR_DTYPE)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, slot, last_used) VALUES (?, ?, ?)",
+                        (key, slot, now),
+                    )
+                self._vectors.flush()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            "identity": self.identity,
+            "entries": len(self),
+            "capacity": self.capacity,
+            **self._counters,
+            "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+
+    def __init__(self, model: Embeddings, cache: EmbeddingCache):
+        self.model = model
+        self.cache = cache
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        try:
+            return self.cache.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+            return {}
+
+    def _store(self, items: Dict[str, List[float]]):
+        try:
+            self.cache.put_many(items)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_key("document", text) for text in texts]
+        found = self._lookup(keys)
+        # Overlapping or repeated chunks in one batch are encoded once.
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, self.model.embed_documents(list(missing.values()))))
+            self._store(computed)
+            found.update(computed)
+        return [[float(v) for v in found[key]] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_key("query", text)
+        found = self._lookup([key])
+        if key in found:
+            return [float(v) for v in found[key]]
+        vector = self.model.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+
+def open_embedding_cache(identity: str) -> Optional[EmbeddingCache]:
+    """Open the on-disk cache, or return None (uncached) if it cannot be opened."""
+    try:
+        return EmbeddingCache(identity)
+    except Exception as e:
+        logger.warning(f"Embedding cache unavailable, embedding without it: {str(e)}")
+        return None
@@ -1,8 +1,60 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from config import EMBEDDINGS_MODEL_NAME
+from utils.embedding_cache import CachedEmbeddings, open_embedding_cache
+from config import (
+    EMBEDDINGS_BACKEND,
+    EMBEDDINGS_MODEL_NAME,
+    EMBEDDINGS_DIMENSION,
+    EMBEDDING_CACHE_ENABLED
+)
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+def load_embedding_model():
+    """Return the process-wide embedding model itself, loading it on first use."""
+    global _model
+    if _model is None:
+        with _embeddings_lock:
+            if _model is None:
+                logger.info(f"Loading embedding model {EMBEDDINGS_MODEL_NAME} ({EMBEDDINGS_BACKEND})")
+                if EMBEDDINGS_BACKEND == "onnx":
+                    from utils.onnx_embeddings import OnnxEmbeddings
+                    _model = OnnxEmbeddings()
+                else:
+                    from langchain_community.embeddings import HuggingFaceEmbeddings
+                    _model = HuggingFaceEmbeddings(
+                        model_name=EMBEDDINGS_MODEL_NAME,
+                    )
+    return _model
 
 def load_embeddings():
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDINGS_MODEL_NAME,
-    )
-    return embeddings
+    """Return the embeddings used for ingestion and queries, behind the embedding cache."""
+    global _embeddings
+    if _embeddings is None:
+        model = load_embedding_model()
+        with _embeddings_lock:
+            if _embeddings is None:
+                cache = None
+                if EMBEDDING_CACHE_ENABLED:
+                    # Quantized ONNX vectors differ slightly from torch ones,
+                    # so switching backend also starts a fresh cache.
+                    cache = open_embedding_cache(
+                        f"{EMBEDDINGS_BACKEND}:{EMBEDDINGS_MODEL_NAME}:{EMBEDDINGS_DIMENSION}"
+                    )
+                _embeddings = CachedEmbeddings(model, cache) if cache is not None else model
+    return _embeddings
+
+def embedding_cache_stats():
+    # Reads the current state only; never loads the model for a stats call.
+    if isinstance(_embeddings, CachedEmbeddings):
+        return _embeddings.cache.stats()
+    return {"enabled": EMBEDDING_CACHE_ENABLED, "loaded": False}
+
+def warmup_embeddings():
+    # The first encode also initializes the tokenizer and kernels. Bypasses
+    # the cache, which would otherwise answer this without touching the model.
+    load_embedding_model().embed_query("warmup")
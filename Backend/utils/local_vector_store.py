@@ -0,0 +1,463 @@
+"""
+Local Vector Store
+Embedded on-disk vector index used instead of Pinecone when
+VECTOR_STORE_BACKEND is "local": exact search over a memory-mapped matrix,
+with an IVF approximate index once a namespace grows large.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config import (
+    EMBEDDINGS_DIMENSION,
+    LOCAL_VECTOR_STORE_DIR,
+    LOCAL_VECTOR_EXACT_MAX_ROWS,
+    LOCAL_VECTOR_IVF_PROBES,
+    LOCAL_VECTOR_IVF_ITERATIONS,
+    LOCAL_VECTOR_IVF_REBUILD_GROWTH,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "__default__"
+
+# Rows scored per matmul during exact search, to bound temporary memory.
+_SEARCH_BLOCK_ROWS = 65536
+# k-means is trained on at most this many sampled rows per list.
+_IVF_TRAIN_ROWS_PER_LIST = 64
+_IVF_MAX_LISTS = 4096
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one record."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq":
+                ok = value == operand
+            elif op == "$ne":
+                ok = value != operand
+            elif op == "$in":
+                ok = value in operand
+            elif op == "$nin":
+                ok = value not in operand
+            elif op == "$exists":
+                ok = (key in metadata) == bool(operand)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                ok = {
+                    "$gt": value > operand,
+                    "$gte": value >= operand,
+                    "$lt": value < operand,
+                    "$lte": value <= operand,
+                }[op]
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not ok:
+                return False
+    return True
+
+
+class LocalVectorIndex:
+    """
+    One namespace on disk: ``vectors.f32`` holds unit-normalized float32 rows
+    appended in insertion order and ``docs.jsonl`` the matching id, text and
+    metadata, one line per row. Re-adding an id appends a new row and the
+    older one is masked out; deleting one appends a tombstone row (a zero
+    vector marked ``deleted``). Writes are therefore always appends.
+    """
+
+    def __init__(self, directory: str, dimension: int = EMBEDDINGS_DIMENSION):
+        self.directory = directory
+        self.dimension = dimension
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._docs_path = os.path.join(directory, "docs.jsonl")
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._lock = threading.RLock()
+        self._docs: List[Dict[str, Any]] = []
+        self._rows_by_id: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._matrix: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._ivf_rows = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ---------------- PERSISTENCE ---------------- #
+
+    def _load(self):
+        docs = []
+        if os.path.exists(self._docs_path):
+            with open(self._docs_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        docs.append(json.loads(line))
+                    except ValueError:
+                        break  # torn final line from an interrupted append
+        row_bytes = self.dimension * 4
+        rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        count = min(rows, len(docs))
+
+        # Drop whatever an interrupted append left without its counterpart.
+        if rows != count or (os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != count * row_bytes):
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(count * row_bytes)
+        if len(docs) != count:
+            docs = docs[:count]
+            with open(self._docs_path, "w", encoding="utf-8") as f:
+                for doc in docs:
+                    f.write(json.dumps(doc) + "\n")
+
+        self._docs = docs
+        self._rows_by_id = {}
+        self._live = np.zeros(count, dtype=bool)
+        for row, doc in enumerate(docs):
+            self._track(doc, row)
+        self._remap()
+
+        if os.path.exists(self._ivf_path):
+            saved = np.load(self._ivf_path)
+            if len(saved["assignments"]) <= count:
+                self._centroids = saved["centroids"]
+                self._assignments = saved["assignments"]
+                self._ivf_rows = len(self._assignments)
+                self._assign_rows(len(self._assignments), count)
+                self._rebuild_lists()
+        if self._needs_ivf_build():
+            self._build_ivf()
+
+    def _track(self, doc: Dict[str, Any], row: int):
+        previous = self._rows_by_id.pop(doc["id"], None)
+        if previous is not None:
+            self._live[previous] = False
+        if doc.get("deleted"):
+            self._live[row] = False
+        else:
+            self._rows_by_id[doc["id"]] = row
+            self._live[row] = True
+
+    def _remap(self):
+        count = len(self._docs)
+        self._matrix = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dimension))
+            if count else None
+        )
+
+    def add(self, vectors: np.ndarray, docs: List[Dict[str, Any]]):
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        if len(vectors) != len(docs):
+            raise ValueError("vectors and docs must have the same length")
+        with self._lock:
+            start = len(self._docs)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._docs_path, "a", encoding="utf-8") as f:
+                for doc in docs:
+                    f.write(json.dumps(doc) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._docs.extend(docs)
+            self._live = np.concatenate([self._live, np.ones(len(docs), dtype=bool)])
+            for offset, doc in enumerate(docs):
+                self._track(doc, start + offset)
+            self._remap()
+
+            if self._centroids is not None:
+                self._assign_rows(start, len(self._docs))
+                self._rebuild_lists()
+            if self._needs_ivf_build():
+                self._build_ivf()
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            ids = [id_ for id_ in dict.fromkeys(ids) if id_ in self._rows_by_id]
+            if ids:
+                self.add(
+                    np.zeros((len(ids), self.dimension), dtype=np.float32),
+                    [{"id": id_, "deleted": True} for id_ in ids],
+                )
+
+    def ids_with_prefix(self, prefix: str) -> List[str]:
+        with self._lock:
+            return [id_ for id_ in self._rows_by_id if id_.startswith(prefix)]
+
+    # ---------------- IVF ---------------- #
+
+    def _needs_ivf_build(self) -> bool:
+        count = len(self._docs)
+        if count <= LOCAL_VECTOR_EXACT_MAX_ROWS:
+            return False
+        return self._centroids is None or count >= self._ivf_rows * LOCAL_VECTOR_IVF_REBUILD_GROWTH
+
+    def _nearest_centroids(self, rows: np.ndarray) -> np.ndarray:
+        return np.argmax(rows @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _assign_rows(self, start: int, end: int):
+        # Rows added since the last k-means go to their nearest existing list.
+        if end <= start:
+            return
+        new = [
+            self._nearest_centroids(np.asarray(self._matrix[i:min(i + _SEARCH_BLOCK_ROWS, end)]))
+            for i in range(start, end, _SEARCH_BLOCK_ROWS)
+        ]
+        self._assignments = np.concatenate([self._assignments[:start], *new])
+
+    def _rebuild_lists(self):
+        order = np.argsort(self._assignments, kind="stable")
+        counts = np.bincount(self._assignments, minlength=len(self._centroids))
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+
+    def _build_ivf(self):
+        count = len(self._docs)
+        n_lists = min(_IVF_MAX_LISTS, max(1, int(np.sqrt(count))))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, n_lists * _IVF_TRAIN_ROWS_PER_LIST), replace=False))
+        sample = np.asarray(self._matrix[sample_rows])
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(LOCAL_VECTOR_IVF_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            populated = np.bincount(assign, minlength=n_lists) > 0
+            centroids[populated] = _normalize(sums[populated])
+
+        self._centroids = centroids
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._assign_rows(0, count)
+        self._rebuild_lists()
+        self._ivf_rows = count
+        np.savez(self._ivf_path, centroids=self._centroids, assignments=self._assignments)
+        logger.info(f"Built IVF index with {n_lists} lists over {count} vectors in {self.directory}")
+
+    # ---------------- SEARCH ---------------- #
+
+    def _exact_scores(self, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for i in range(0, len(matrix), _SEARCH_BLOCK_ROWS):
+            scores[i:i + _SEARCH_BLOCK_ROWS] = matrix[i:i + _SEARCH_BLOCK_ROWS] @ query
+        return scores
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Top-k live records by cosine similarity, optionally metadata-filtered."""
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(self.dimension))
+        with self._lock:
+            count = len(self._docs)
+            if count == 0 or k <= 0:
+                return []
+            matrix, docs, live = self._matrix, self._docs, self._live
+            centroids, lists = self._centroids, self._lists
+
+        candidates = None
+        if filter:
+            candidates = np.fromiter(
+                (row for row in range(count) if live[row] and _matches(docs[row].get("metadata", {}), filter)),
+                dtype=np.int64,
+            )
+            if len(candidates) == 0:
+                return []
+
+        if centroids is not None and (candidates is None or len(candidates) > LOCAL_VECTOR_EXACT_MAX_ROWS):
+            probe = np.argsort(-(centroids @ query))[:LOCAL_VECTOR_IVF_PROBES]
+            probed = np.concatenate([lists[c] for c in probe])
+            probed = probed[probed < count]
+            if candidates is not None:
+                probed = np.intersect1d(probed, candidates, assume_unique=True)
+            # Too few hits in the probed lists: fall back to exact search.
+            if len(probed) >= k:
+                candidates = np.sort(probed)
+
+        if candidates is None:
+            scores = self._exact_scores(matrix, query)
+            scores[~live] = -np.inf
+            rows = np.arange(count)
+        else:
+            candidates = candidates[live[candidates]]
+            scores = self._exact_scores(matrix[candidates], query)
+            rows = candidates
+
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(docs[rows[i]], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": len(self._docs),
+                "live": int(self._live.sum()),
+                "ivf_lists": 0 if self._centroids is None else len(self._centroids),
+                "ivf_rows": self._ivf_rows,
+            }
+
+
+class LocalVectorStore(VectorStore):
+    """
+    LangChain VectorStore over one LocalVectorIndex per namespace, accepting
+    the same ``namespace`` and ``filter`` arguments as PineconeVectorStore.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        directory: str = LOCAL_VECTOR_STORE_DIR,
+        dimension: int = EMBEDDINGS_DIMENSION,
+        namespace: Optional[str] = None,
+    ):
+        self._embedding = embedding
+        self.directory = directory
+        self.dimension = dimension
+        self.namespace = namespace
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _index(self, namespace: Optional[str]) -> LocalVectorIndex:
+        name = namespace or self.namespace or DEFAULT_NAMESPACE
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+                index = LocalVectorIndex(os.path.join(self.directory, safe_name), self.dimension)
+                self._indexes[name] = index
+            return index
+
+    def add_vectors(
+        self,
+        vectors: np.ndarray,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+    ) -> List[str]:
+        """Store precomputed embeddings for texts."""
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        self._index(namespace).add(
+            vectors,
+            [
+                {"id": id_, "text": text, "metadata": metadata}
+                for id_, text, metadata in zip(ids, texts, metadatas)
+            ],
+        )
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: Optional[str] = None, **kwargs: Any) -> bool:
+        if ids:
+            self._index(namespace).delete(list(ids))
+        return True
+
+    def list_ids(self, prefix: str = "", namespace: Optional[str] = None) -> List[str]:
+        """Live ids starting with prefix, like Pinecone's ``Index.list``."""
+        return self._index(namespace).ids_with_prefix(prefix)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        return self.add_vectors(vectors, texts, metadatas, ids, namespace)
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        hits = self._index(namespace).search(np.asarray(embedding, dtype=np.float32), k, filter)
+        return [
+            (Document(page_content=doc["text"], metadata=doc.get("metadata", {}), id=doc["id"]), score)
+            for doc, score in hits
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k, filter, namespace
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Cosine similarity in [-1, 1] mapped onto [0, 1].
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        namespace = kwargs.pop("namespace", None)
+        store = cls(embedding=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids, namespace=namespace)
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = dict(self._indexes)
+        return {name: index.stats() for name, index in indexes.items()}
@@ -0,0 +1,181 @@
+"""
+ONNX Embeddings
+Runs the int8-quantized ONNX export of the embedding model on ONNX Runtime
+instead of loading PyTorch. Documents are encoded in length-sorted batches to
+keep padding low, and concurrent single queries are coalesced into one batch.
+
+Check parity with the PyTorch backend with:
+    python -m utils.onnx_embeddings
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDINGS_MODEL_NAME,
+    EMBEDDINGS_MAX_SEQ_LENGTH,
+    ONNX_EMBEDDINGS_FILE,
+    ONNX_EMBEDDINGS_THREADS,
+    ONNX_EMBEDDINGS_BATCH_SIZE,
+    ONNX_QUERY_BATCH_WAIT_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+PARITY_MIN_COSINE = 0.99
+PARITY_SAMPLE_TEXTS = [
+    "Thanks for calling, how can I help you today?",
+    "I was charged twice for my order last week and I'd like a refund.",
+    "The technician will come by on Tuesday between nine and noon.",
+    "Can you escalate this to your manager? This is the third time I've called.",
+    "okay",
+    "We agreed to move the launch to March and revisit the budget next quarter. "
+    "Priya owns the vendor contract and will send the revised numbers by Friday.",
+]
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Mean-pooled, L2-normalized sentence embeddings from an ONNX export of a
+    sentence-transformers model, matching what the PyTorch backend returns.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDINGS_MODEL_NAME,
+        model_file: str = ONNX_EMBEDDINGS_FILE,
+        max_length: int = EMBEDDINGS_MAX_SEQ_LENGTH,
+        threads: int = ONNX_EMBEDDINGS_THREADS,
+        batch_size: int = ONNX_EMBEDDINGS_BATCH_SIZE,
+        query_wait_ms: float = ONNX_QUERY_BATCH_WAIT_MS,
+    ):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            hf_hub_download(model_name, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self._query_wait = query_wait_ms / 1000
+        self._queries: "Queue[Tuple[str, Future]]" = Queue()
+        self._query_worker = threading.Thread(
+            target=self._coalesce_queries, name="convox-onnx-queries", daemon=True
+        )
+        self._query_worker.start()
+
+    def _run(self, encodings: List[Any]) -> np.ndarray:
+        """Encode one batch, padded to its own longest sequence."""
+        length = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(encodings), length), dtype=np.int64)
+        mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            ids[row, :len(encoding.ids)] = encoding.ids
+            mask[row, :len(encoding.ids)] = 1
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feed)[0]
+
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        # Batching neighbours by length keeps padded positions, which cost as
+        # much as real tokens, to a minimum.
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors: Optional[np.ndarray] = None
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            result = self._run([encodings[i] for i in batch])
+            if vectors is None:
+                vectors = np.empty((len(texts), result.shape[1]), dtype=np.float32)
+            vectors[batch] = result
+        return vectors
+
+    def _coalesce_queries(self):
+        while True:
+            pending = [self._queries.get()]
+            try:
+                while len(pending) < self.batch_size:
+                    pending.append(self._queries.get(timeout=self._query_wait))
+            except Empty:
+                pass
+            try:
+                vectors = self._encode([text for text, _ in pending])
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(pending, vectors):
+                future.set_result(vector.tolist())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        # Chat requests embed one question each; queries that arrive within
+        # ONNX_QUERY_BATCH_WAIT_MS of each other share a single session run.
+        future: Future = Future()
+        self._queries.put((text, future))
+        return future.result()
+
+
+def check_embedding_parity(
+    texts: Optional[List[str]] = None,
+    min_cosine: float = PARITY_MIN_COSINE,
+) -> Dict[str, Any]:
+    """
+    Embed the same texts with the ONNX and PyTorch backends and compare.
+
+    Args:
+        texts: Texts to compare (a built-in sample of call snippets if omitted)
+        min_cosine: Lowest per-text cosine similarity that still passes
+
+    Returns:
+        Dict with min/mean cosine similarity and whether the check passed
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    texts = texts or PARITY_SAMPLE_TEXTS
+    onnx = np.asarray(OnnxEmbeddings().embed_documents(texts))
+    reference = np.asarray(HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL_NAME).embed_documents(texts))
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    cosine = (onnx * reference).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "threshold": min_cosine,
+        "passed": bool(cosine.min() >= min_cosine),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    result = check_embedding_parity()
+    print(result)
+    raise SystemExit(0 if result["passed"] else 1)
@@ -7,6 +7,7 @@ authentication, storage, and database operations with RLS support.
 from supabase import create_client, Client
 from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY
 from typing import Optional, Dict, Any, List
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -118,6 +119,12 @@ async def delete_file_from_storage(bucket_name: str, file_path: str):
     client.storage.from_(bucket_name).remove([file_path])
 
 
+async def download_file_from_storage(bucket_name: str, file_path: str) -> bytes:
+    client = SupabaseClient.service()
+    # Recordings can be tens of MB; keep the transfer off the event loop.
+    return await asyncio.to_thread(client.storage.from_(bucket_name).download, file_path)
+
+
 async def get_signed_file_url(bucket_name: str, file_path: str, expires_in: int):
     client = SupabaseClient.service()
     res = client.storage.from_(bucket_name).create_signed_url(file_path, expires_in)
@@ -140,6 +147,35 @@ async def update_record(table: str, record_id: str, data: Dict[str, Any], access
     return res.data[0]
 
 
+async def upsert_record(
+    table: str,
+    data: Dict[str, Any],
+    access_token: str,
+    on_conflict: str = "id",
+):
+    client = get_authed_rls_client(access_token)
+    res = client.table(table).upsert(data, on_conflict=on_conflict).execute()
+    return res.data[0]
+
+
+# ------------------------------------------------------------------
+# DATABASE (SERVICE ROLE, BYPASSES RLS)
+# ------------------------------------------------------------------
+# Only for background work that runs after the request, and possibly the
+# user's token, has gone. Callers must scope writes to the right user.
+
+async def service_update_record(table: str, record_id: str, data: Dict[str, Any]):
+    client = SupabaseClient.service()
+    res = client.table(table).update(data).eq("id", record_id).execute()
+    return res.data[0]
+
+
+async def service_upsert_record(table: str, data: Dict[str, Any], on_conflict: str = "id"):
+    client = SupabaseClient.service()
+    res = client.table(table).upsert(data, on_conflict=on_conflict).execute()
+    return res.data[0]
+
+
 async def get_records(
     table: str,
     filters: Optional[Dict[str, Any]] = None,
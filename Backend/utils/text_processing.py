@@ -1,18 +1,95 @@
 from utils.audio import transcribe_audio_simple
 
-from langchain.text_splitters import RecursiveCharacterTextSplitter
-from config import CHUNK_SIZE, CHUNK_OVERLAP, TEXT_SEPARATORS
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config import CHUNK_SIZE, CHUNK_OVERLAP, TEXT_SEPARATORS, TOKENIZER_ENCODING
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        # The BPE file is fetched on first use; offline we fall back to an estimate.
+        return None
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count of text (provider tokenizers differ slightly)."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
 
 def text_extractor(audio_file_path):
     transcript = transcribe_audio_simple(audio_file_path)
     return transcript
 
-def split_extracted_text(transcript):
+def split_extracted_text(
+    transcript,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    length_function: Callable[[str], int] = len
+):
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=TEXT_SEPARATORS
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=TEXT_SEPARATORS,
+        length_function=length_function
     )
     chunks = text_splitter.split_text(transcript)
     return chunks
 
+
+def split_transcription(
+    transcription: Dict[str, Any],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP
+) -> List[Dict[str, Any]]:
+    """
+    Split a transcription into chunks with their character offsets in the
+    transcript and, when segments are available, the audio time they span.
+
+    Returns:
+        List of dicts with text, chunk_index, start_char, end_char and
+        optionally start_time / end_time in seconds
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=TEXT_SEPARATORS,
+        add_start_index=True
+    )
+    documents = text_splitter.create_documents([transcription["text"]])
+
+    # transcription["text"] is the segment texts joined by single spaces, so
+    # each segment's character offset follows from the lengths before it.
+    segments = transcription.get("segments") or []
+    segment_starts = []
+    offset = 0
+    for segment in segments:
+        segment_starts.append(offset)
+        offset += len(segment["text"]) + 1
+    if offset - 1 != len(transcription["text"]):
+        segments = []  # text was not built from these segments; skip timestamps
+
+    chunks = []
+    for chunk_index, document in enumerate(documents):
+        start_char = document.metadata.get("start_index", -1)
+        if start_char < 0:
+            start_char = transcription["text"].find(document.page_content)
+        end_char = start_char + len(document.page_content)
+        chunk = {
+            "text": document.page_content,
+            "chunk_index": chunk_index,
+            "start_char": start_char,
+            "end_char": end_char,
+        }
+        if segments and start_char >= 0:
+            first = max(bisect_right(segment_starts, start_char) - 1, 0)
+            last = max(bisect_right(segment_starts, end_char - 1) - 1, 0)
+            chunk["start_time"] = float(segments[first]["start"])
+            chunk["end_time"] = float(segments[last]["end"])
+        chunks.append(chunk)
+    return chunks
@@ -0,0 +1,179 @@
+"""
+Transcript Cache
+Content-addressed cache for Whisper transcripts with an in-memory LRU tier
+in front of an on-disk tier that is evicted by total size.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import (
+    TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+    TRANSCRIPT_CACHE_DIR,
+    TRANSCRIPT_CACHE_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached value format changes so old entries are never read back.
+CACHE_FORMAT_VERSION = 2
+
+
+def make_cache_key(audio: bytes | str, model_size: str, **options: Any) -> str:
+    """
+    Build the cache key for a piece of audio.
+
+    Args:
+        audio: Encoded audio bytes, or a path to an audio file
+        model_size: Whisper model size used for transcription
+        **options: Decode/transcribe options that change the output
+
+    Returns:
+        Hex digest identifying the audio content and transcription settings
+    """
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray)):
+        digest.update(audio)
+    else:
+        with open(audio, "rb") as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(block)
+    settings = json.dumps(
+        {"v": CACHE_FORMAT_VERSION, "model": model_size, **options},
+        sort_keys=True,
+    )
+    digest.update(settings.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        memory_entries: int = TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+        cache_dir: str = TRANSCRIPT_CACHE_DIR,
+        max_disk_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+    ):
+        self.memory_entries = memory_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    # ---------------- DISK TIER ---------------- #
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _get_disk_bytes(self) -> int:
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+        return self._disk_bytes
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                value = json.load(fh)
+            # mtime doubles as the last-access time for eviction
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable transcript cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value).encode("utf-8")
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        self._disk_bytes = self._get_disk_bytes() + len(data) - previous
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Drop least recently used files until the tier is back under 90% of its budget."""
+        target = int(self.max_disk_bytes * 0.9)
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    # ---------------- PUBLIC API ---------------- #
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return self._memory[key]
+
+            value = self._read_disk(key)
+            if value is not None:
+                self._counters["disk_hits"] += 1
+                self._remember(key, value)
+                return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+            try:
+                self._write_disk(key, value)
+            except OSError as e:
+                logger.warning(f"Failed to persist transcript cache entry {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.memory_entries,
+                "disk_bytes": self._get_disk_bytes(),
+                "disk_max_bytes": self.max_disk_bytes,
+            }
+
+
+transcript_cache = TranscriptCache()
@@ -0,0 +1,186 @@
+"""
+Transcript Compaction
+Strips disfluencies, stuttered words and Whisper's repeated-phrase loops from
+a transcript before it is sent to the LLM, and enforces a token budget.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from utils.text_processing import count_tokens, _get_encoding
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the rules below change so cached LLM results are not reused.
+COMPACTION_VERSION = "3"
+
+# Pure hesitation sounds only; words such as "like" or "you know" carry
+# meaning often enough that dropping them could change a summary. Matching is
+# case-sensitive so that "ER" (emergency room) survives: lowercase forms are
+# dropped anywhere, capitalized ones only when followed by a comma or ellipsis.
+_FILLER = re.compile(
+    r"(?<![\w-])(?:"
+    r"(?:u+m+|u+h+|e+r+m+|e+r+|a+h+|h+m+|m{2,})(?![\w-])[,.\u2026]*"
+    r"|(?:U[mh]+|Er+m*|Ah+|Hm+)(?:,|\.\.\.|\u2026)"
+    r")\s*"
+)
+# "I I I think" -> "I think". Alphabetic tokens only, and only at three or
+# more occurrences, since "had had" or "that that" are often grammatical.
+_STUTTER = re.compile(r"(?<![\w'])([^\W\d_]+(?:'[^\W\d_]+)?)(?:[\s,]+\1(?![\w'])){2,}", re.IGNORECASE)
+# A phrase of 2-8 words repeated back to back three or more times.
+_PHRASE_LOOP = re.compile(r"\b((?:\w+[\s,]+){1,7}\w+)(?:[\s,.!?]+\1\b){2,}", re.IGNORECASE)
+# Repeated digits and number words are data (phone numbers, IDs, prices),
+# never disfluency, so nothing containing them is collapsed.
+_NUMBER_WORDS = {
+    "zero", "oh", "o", "one", "two", "three", "four", "five", "six", "seven",
+    "eight", "nine", "ten", "eleven", "twelve", "thirteen", "fourteen",
+    "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty",
+    "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety",
+    "hundred", "thousand", "million", "billion", "double", "triple",
+}
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+# Short replies such as "No. No." or "Bye. Bye." are often two speakers, so
+# only sentences at least this long are merged when repeated.
+_MIN_REPEATED_SENTENCE_WORDS = 4
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.!?;:])")
+_REPEATED_PUNCT = re.compile(r"([,.!?;:])(?:\s*[,;:])+")
+_WHITESPACE = re.compile(r"[ \t]+")
+
+
+@dataclass
+class CompactionStats:
+    original_tokens: int = 0
+    compacted_tokens: int = 0
+    fillers_removed: int = 0
+    repeats_collapsed: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+
+_totals = {
+    "transcripts": 0,
+    "original_tokens": 0,
+    "compacted_tokens": 0,
+    "fillers_removed": 0,
+    "repeats_collapsed": 0,
+    "truncated": 0,
+}
+_totals_lock = threading.Lock()
+
+
+def _has_number(text: str) -> bool:
+    if any(char.isdigit() for char in text):
+        return True
+    return any(token in _NUMBER_WORDS for token in re.findall(r"\w+", text.lower()))
+
+
+def _collapse_repeats(pattern: re.Pattern, line: str) -> Tuple[str, int]:
+    """Replace each repeat run matched by pattern with one copy, skipping numbers."""
+    collapsed = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal collapsed
+        if _has_number(match.group(1)):
+            return match.group(0)
+        collapsed += 1
+        return match.group(1)
+
+    return pattern.sub(replace, line), collapsed
+
+
+def _normalize(sentence: str) -> str:
+    return re.sub(r"\W+", " ", sentence).strip().lower()
+
+
+def _collapse_repeated_sentences(text: str) -> Tuple[str, int]:
+    # Whisper tends to loop the same line over silence or music.
+    kept = []
+    collapsed = 0
+    previous = None
+    for sentence in _SENTENCE.split(text):
+        key = _normalize(sentence)
+        if (
+            key
+            and key == previous
+            and len(key.split()) >= _MIN_REPEATED_SENTENCE_WORDS
+            and not _has_number(key)
+        ):
+            collapsed += 1
+            continue
+        kept.append(sentence)
+        previous = key or previous
+    return " ".join(kept), collapsed
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        truncated = text[: max_tokens * 4]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        truncated = text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    if truncated != text:
+        logger.warning(f"Prompt input exceeds the {max_tokens}-token budget, truncating")
+        with _totals_lock:
+            _totals["truncated"] += 1
+    return truncated
+
+
+def compact_transcript(text: str) -> Tuple[str, CompactionStats]:
+    """
+    Remove fillers, stutters and repeated segments and normalize whitespace.
+    Token budgets are enforced per LLM call with truncate_to_tokens.
+
+    Args:
+        text: Raw transcript
+
+    Returns:
+        Tuple of (compacted transcript, CompactionStats)
+    """
+    stats = CompactionStats(original_tokens=count_tokens(text))
+
+    lines = []
+    for line in text.splitlines():
+        line, fillers = _FILLER.subn("", line)
+        stats.fillers_removed += fillers
+        line, loops = _collapse_repeats(_PHRASE_LOOP, line)
+        line, stutters = _collapse_repeats(_STUTTER, line)
+        line = _REPEATED_PUNCT.sub(r"\1", _SPACE_BEFORE_PUNCT.sub(r"\1", line))
+        line = _WHITESPACE.sub(" ", line).strip(" ,")
+        line, sentences = _collapse_repeated_sentences(line)
+        stats.repeats_collapsed += loops + stutters + sentences
+        if line:
+            lines.append(line)
+    compacted = "\n".join(lines)
+
+    stats.compacted_tokens = count_tokens(compacted)
+
+    with _totals_lock:
+        _totals["transcripts"] += 1
+        _totals["original_tokens"] += stats.original_tokens
+        _totals["compacted_tokens"] += stats.compacted_tokens
+        _totals["fillers_removed"] += stats.fillers_removed
+        _totals["repeats_collapsed"] += stats.repeats_collapsed
+
+    logger.info(
+        f"Compacted transcript {stats.original_tokens} -> {stats.compacted_tokens} tokens "
+        f"({stats.fillers_removed} fillers, {stats.repeats_collapsed} repeats)"
+    )
+    return compacted, stats
+
+
+def compaction_stats() -> Dict[str, Any]:
+    with _totals_lock:
+        totals = dict(_totals)
+    saved = totals["original_tokens"] - totals["compacted_tokens"]
+    return {
+        **totals,
+        "tokens_saved": saved,
+        "saved_ratio": saved / totals["original_tokens"] if totals["original_tokens"] else 0.0,
+    }
@@ -1,20 +1,59 @@
-from pinecone import Pinecone, ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
-from utils.embeddings import load_embeddings
+from langchain_core.vectorstores import VectorStore
+from utils.embeddings import load_embeddings, warmup_embeddings, embedding_cache_stats
+from utils.local_vector_store import LocalVectorStore
+from utils.text_processing import split_transcription
 from config import (
+    VECTOR_STORE_BACKEND,
     PINECONE_API_KEY,
     PINECONE_INDEX_NAME,
     PINECONE_DIMENSION,
     PINECONE_METRIC,
     PINECONE_CLOUD,
     PINECONE_REGION,
+    LOCAL_VECTOR_STORE_DIR,
+    VECTOR_INDEX_VERSION_PATH,
+    EMBEDDINGS_DIMENSION,
+    EMBEDDING_BATCH_SIZE,
+    INGEST_UPSERT_CONCURRENCY,
+    INGEST_UPSERT_RETRIES,
+    INGEST_RETRY_BACKOFF_SECONDS,
     RETRIEVER_SEARCH_TYPE,
     RETRIEVER_TOP_K
 )
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+import threading
+import logging
+import os
+import sqlite3
+import time
+import uuid
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
+logger = logging.getLogger(__name__)
+
+# Metadata key PineconeVectorStore reads the chunk text back from.
+PINECONE_TEXT_KEY = "text"
+
+_pinecone_client = None
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+_upsert_executor: Optional[ThreadPoolExecutor] = None
+_versions_conn: Optional[sqlite3.Connection] = None
+_versions_lock = threading.Lock()
+
+def get_pinecone_client():
+    """Return the Pinecone client, created on first use rather than at import."""
+    global _pinecone_client
+    if _pinecone_client is None:
+        from pinecone import Pinecone
+        _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+    return _pinecone_client
 
 def get_or_create_index():
+    from pinecone import ServerlessSpec
+    pc = get_pinecone_client()
     if not pc.has_index(PINECONE_INDEX_NAME):
         pc.create_index(
             name=PINECONE_INDEX_NAME,
@@ -27,23 +66,310 @@ def get_or_create_index():
         )
     return PINECONE_INDEX_NAME
 
-def ingest_text_chunks(chunks):
-    embeddings = load_embeddings()
-    index_name = get_or_create_index()
-    vectorstore = PineconeVectorStore.from_texts(
-        texts=chunks,
-        embedding=embeddings,
-        index_name=index_name
+def _create_vector_store() -> VectorStore:
+    if VECTOR_STORE_BACKEND == "local":
+        logger.info(f"Using local vector store at {LOCAL_VECTOR_STORE_DIR}")
+        return LocalVectorStore(
+            embedding=load_embeddings(),
+            directory=LOCAL_VECTOR_STORE_DIR,
+            dimension=EMBEDDINGS_DIMENSION
+        )
+    if VECTOR_STORE_BACKEND == "pinecone":
+        from langchain_pinecone import PineconeVectorStore
+        return PineconeVectorStore(
+            index_name=get_or_create_index(),
+            embedding=load_embeddings(),
+            text_key=PINECONE_TEXT_KEY,
+            pinecone_api_key=PINECONE_API_KEY
+        )
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide vector store for the configured backend."""
+    global _vectorstore
+    if _vectorstore is None:
+        with _vectorstore_lock:
+            if _vectorstore is None:
+                _vectorstore = _create_vector_store()
+    return _vectorstore
+
+def upsert_embeddings(
+    vectors: List[List[float]],
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+    namespace: Optional[str] = None
+):
+    """Write already-embedded chunks to the configured backend."""
+    vectorstore = get_vector_store()
+    if isinstance(vectorstore, LocalVectorStore):
+        vectorstore.add_vectors(vectors, texts, metadatas, ids, namespace)
+        return
+    index = get_pinecone_client().Index(PINECONE_INDEX_NAME)
+    index.upsert(
+        vectors=[
+            {
+                "id": id_,
+                "values": [float(v) for v in vector],
+                "metadata": {**metadata, PINECONE_TEXT_KEY: text},
+            }
+            for id_, vector, text, metadata in zip(ids, vectors, texts, metadatas)
+        ],
+        namespace=namespace or ""
     )
-    return vectorstore
 
-def get_retriever():
+def delete_stale_vectors(prefix: str, keep: List[str], namespace: Optional[str] = None) -> int:
+    """Delete every vector whose id starts with prefix and is not in keep."""
+    keep_ids = set(keep)
+    vectorstore = get_vector_store()
+    if isinstance(vectorstore, LocalVectorStore):
+        stale = [id_ for id_ in vectorstore.list_ids(prefix, namespace) if id_ not in keep_ids]
+        vectorstore.delete(stale, namespace=namespace)
+        return len(stale)
+    index = get_pinecone_client().Index(PINECONE_INDEX_NAME)
+    stale = [
+        id_
+        for page in index.list(prefix=prefix, namespace=namespace or "")
+        for id_ in page
+        if id_ not in keep_ids
+    ]
+    # Pinecone accepts at most 1000 ids per delete.
+    for i in range(0, len(stale), 1000):
+        index.delete(ids=stale[i:i + 1000], namespace=namespace or "")
+    return len(stale)
+
+# ---------------- INDEX VERSIONS ---------------- #
+
+def _get_versions_conn() -> sqlite3.Connection:
+    # SQLite so every worker process sees the same versions.
+    global _versions_conn
+    if _versions_conn is None:
+        os.makedirs(os.path.dirname(VECTOR_INDEX_VERSION_PATH), exist_ok=True)
+        _versions_conn = sqlite3.connect(VECTOR_INDEX_VERSION_PATH, check_same_thread=False, timeout=5)
+        _versions_conn.execute("PRAGMA journal_mode=WAL")
+        _versions_conn.execute(
+            "CREATE TABLE IF NOT EXISTS index_versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        _versions_conn.commit()
+    return _versions_conn
+
+def bump_index_version(namespace: Optional[str]):
+    with _versions_lock:
+        conn = _get_versions_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO index_versions (namespace, version) VALUES (?, ?)",
+            (namespace or "", time.time_ns())
+        )
+        conn.commit()
+
+def get_index_version(namespace: Optional[str]) -> int:
+    """Changes whenever chunks are written to the namespace (0 if never)."""
+    with _versions_lock:
+        row = _get_versions_conn().execute(
+            "SELECT version FROM index_versions WHERE namespace = ?", (namespace or "",)
+        ).fetchone()
+    return row[0] if row else 0
+
+# ---------------- INGESTION ---------------- #
+
+@dataclass
+class IngestionStats:
+    chunks: int = 0
+    batches: int = 0
+    retries: int = 0
+    encode_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+_ingestion_totals = IngestionStats()
+_ingestion_totals_lock = threading.Lock()
+
+def _get_upsert_executor() -> ThreadPoolExecutor:
+    global _upsert_executor
+    if _upsert_executor is None:
+        _upsert_executor = ThreadPoolExecutor(
+            max_workers=INGEST_UPSERT_CONCURRENCY,
+            thread_name_prefix="convox-upsert"
+        )
+    return _upsert_executor
+
+def _upsert_with_retry(vectors, texts, metadatas, ids, namespace) -> tuple[float, int]:
+    # Only the failing batch is retried; batches already written stay written.
+    for attempt in range(INGEST_UPSERT_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            upsert_embeddings(vectors, texts, metadatas, ids, namespace)
+            return time.perf_counter() - start, attempt
+        except Exception as e:
+            if attempt == INGEST_UPSERT_RETRIES:
+                raise
+            delay = INGEST_RETRY_BACKOFF_SECONDS * 2 ** attempt
+            logger.warning(f"Upsert of {len(ids)} chunks failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def ingest_text_chunks(
+    chunks: List[str],
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    ids: Optional[List[str]] = None,
+    namespace: Optional[str] = None
+) -> IngestionStats:
+    """
+    Embed and index chunks in batches of EMBEDDING_BATCH_SIZE. Each batch is
+    upserted on a worker thread while the next one is being encoded, with up
+    to INGEST_UPSERT_CONCURRENCY upserts in flight.
+
+    Args:
+        chunks: Texts to index
+        metadatas: Optional metadata per chunk
+        ids: Optional vector ids per chunk (random if omitted)
+        namespace: Optional index namespace
+
+    Returns:
+        IngestionStats with timings and chunks/s throughput
+    """
+    stats = IngestionStats()
+    start = time.perf_counter()
     embeddings = load_embeddings()
-    vectorstore = PineconeVectorStore(
-        index_name=PINECONE_INDEX_NAME,
-        embedding=embeddings
+    metadatas = metadatas or [{} for _ in chunks]
+    ids = ids or [uuid.uuid4().hex for _ in chunks]
+    executor = _get_upsert_executor()
+    in_flight: Deque[Future] = deque()
+
+    def collect(future: Future):
+        seconds, retries = future.result()
+        stats.upsert_seconds += seconds
+        stats.retries += retries
+
+    try:
+        for i in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+            batch = slice(i, i + EMBEDDING_BATCH_SIZE)
+            encode_start = time.perf_counter()
+            vectors = embeddings.embed_documents(chunks[batch])
+            stats.encode_seconds += time.perf_counter() - encode_start
+
+            while len(in_flight) >= INGEST_UPSERT_CONCURRENCY:
+                collect(in_flight.popleft())
+            in_flight.append(executor.submit(
+                _upsert_with_retry, vectors, chunks[batch], metadatas[batch], ids[batch], namespace
+            ))
+            stats.chunks += len(vectors)
+            stats.batches += 1
+        while in_flight:
+            collect(in_flight.popleft())
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    stats.elapsed_seconds = time.perf_counter() - start
+    if stats.chunks:
+        try:
+            bump_index_version(namespace)
+        except Exception as e:
+            logger.error(f"Failed to bump index version for {namespace}: {str(e)}")
+    with _ingestion_totals_lock:
+        _ingestion_totals.chunks += stats.chunks
+        _ingestion_totals.batches += stats.batches
+        _ingestion_totals.retries += stats.retries
+        _ingestion_totals.encode_seconds += stats.encode_seconds
+        _ingestion_totals.upsert_seconds += stats.upsert_seconds
+        _ingestion_totals.elapsed_seconds += stats.elapsed_seconds
+    logger.info(
+        f"Ingested {stats.chunks} chunks in {stats.elapsed_seconds:.2f}s "
+        f"({stats.chunks_per_second:.1f} chunks/s, encode {stats.encode_seconds:.2f}s, "
+        f"upsert {stats.upsert_seconds:.2f}s)"
     )
-    return vectorstore.as_retriever(
+    return stats
+
+def user_namespace(user_id: str) -> str:
+    """Index namespace holding one user's calls; every query is confined to it."""
+    return f"user-{user_id}"
+
+def ingest_transcription(
+    transcription: Dict[str, Any],
+    user_id: str,
+    audio_file_id: str
+) -> IngestionStats:
+    """
+    Chunk a call's transcript and index it in the user's namespace, with the
+    file, chunk offsets and audio timestamps attached to every chunk.
+    Chunk ids are derived from the file, so re-indexing a call overwrites it,
+    and chunks left over from an earlier, longer indexing are deleted.
+    """
+    chunks = split_transcription(transcription)
+    indexed_at = int(time.time())
+    metadatas = []
+    for chunk in chunks:
+        metadata = {
+            "user_id": user_id,
+            "audio_file_id": audio_file_id,
+            "indexed_at": indexed_at,
+        }
+        metadata.update({key: value for key, value in chunk.items() if key != "text"})
+        metadatas.append(metadata)
+    ids = [f"{audio_file_id}-{chunk['chunk_index']}" for chunk in chunks]
+    namespace = user_namespace(user_id)
+    stats = ingest_text_chunks(
+        [chunk["text"] for chunk in chunks],
+        metadatas=metadatas,
+        ids=ids,
+        namespace=namespace
+    )
+    # Deleted after the new chunks are written rather than before, so the
+    # call never drops out of retrieval while it is being re-indexed.
+    stale = delete_stale_vectors(f"{audio_file_id}-", ids, namespace)
+    if stale:
+        logger.info(f"Deleted {stale} stale chunks of {audio_file_id}")
+        try:
+            bump_index_version(namespace)
+        except Exception as e:
+            logger.error(f"Failed to bump index version for {namespace}: {str(e)}")
+    return stats
+
+def ingestion_stats() -> Dict[str, Any]:
+    with _ingestion_totals_lock:
+        totals = _ingestion_totals
+        stats = {
+            "backend": VECTOR_STORE_BACKEND,
+            "chunks": totals.chunks,
+            "batches": totals.batches,
+            "retries": totals.retries,
+            "encode_seconds": round(totals.encode_seconds, 3),
+            "upsert_seconds": round(totals.upsert_seconds, 3),
+            "chunks_per_second": round(totals.chunks_per_second, 2),
+        }
+    stats["embedding_cache"] = embedding_cache_stats()
+    return stats
+
+def shutdown_ingestion():
+    global _upsert_executor
+    if _upsert_executor is not None:
+        _upsert_executor.shutdown(wait=False, cancel_futures=True)
+        _upsert_executor = None
+
+# ---------------- RETRIEVAL ---------------- #
+
+def get_retriever(user_id: str, filter: Optional[Dict[str, Any]] = None):
+    """
+    Retriever over the user's own namespace only.
+
+    Args:
+        user_id: Caller whose calls are searched
+        filter: Optional Pinecone-style metadata filter, e.g.
+            {"audio_file_id": {"$in": [...]}}
+    """
+    search_kwargs: Dict[str, Any] = {"k": RETRIEVER_TOP_K, "namespace": user_namespace(user_id)}
+    if filter:
+        search_kwargs["filter"] = filter
+    return get_vector_store().as_retriever(
         search_type=RETRIEVER_SEARCH_TYPE,
-        search_kwargs={"k": RETRIEVER_TOP_K}
-    )
\ No newline at end of file
+        search_kwargs=search_kwargs
+    )
+
+def warmup_vector_store():
+    """Load the embedding model and open the index so the first query pays neither."""
+    warmup_embeddings()
+    get_vector_store()